@@ -0,0 +1,157 @@
+import os
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from climatology_grid import PERIOD_KEYS
+from generations import current_generation, write_generation
+from processing_monthly_weekly import output_file_path, output_partitions
+
+# 전 지점 월/주차 집계를 하나로 모은 컬럼 저장소 (지점별 CSV 74개 × 2를 열지 않고 조회)
+#
+#   <output>/aggregate_store/<monthly|weekly>/CURRENT       현재 세대 이름 (g<N>)
+#   <output>/aggregate_store/<monthly|weekly>/g<N>/<컬럼>.npy
+#
+# 행은 (stn_id, year, period) 순으로 정렬돼 있어 지점/연도 범위는 searchsorted로 잘라 읽고,
+# 기간(월 또는 ISO 주) 조건은 잘라 낸 구간에서만 np.isin으로 거른다. 컬럼은 memory-map으로 필요한 것만 읽는다.
+# 주차별 행의 year는 ISO 연도다 (출력 CSV의 year는 주 첫날의 달력 연도라 12월 말에 시작하는 1주차가
+# 앞 해로 들어가 있다). doy(주/월 첫날)는 키가 아닌 일반 컬럼으로 남긴다.
+# 세대를 다 쓴 뒤 CURRENT만 바꾸므로 (generations 참고) 다시 만드는 중에도 조회할 수 있다.
+
+AGGREGATE_STORE_DIR = 'aggregate_store'
+KEY_DTYPES = {'stn_id': 'int32', 'year': 'int16', 'period': 'int8'}
+KEY_COLUMNS = list(KEY_DTYPES)
+
+
+class AggregateStore:
+    """(지점, 기간 종류, 연도, 기간) 키의 집계 저장소"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _current(self, period_type):
+        return current_generation(os.path.join(self.root, period_type))
+
+    def columns(self, period_type):
+        """저장된 집계 컬럼 (키 제외, 출력 CSV 순서)"""
+        generation = self._current(period_type)
+        if generation is None:
+            return []
+        with open(os.path.join(generation, 'columns.txt'), encoding='utf-8') as f:
+            return f.read().split()
+
+    def write(self, period_type, df):
+        """집계 프레임(KEY_COLUMNS + 집계 컬럼) 전체를 새 세대로 저장"""
+        df = df.sort_values(KEY_COLUMNS, kind='stable').reset_index(drop=True)
+        columns = [c for c in df.columns if c not in KEY_DTYPES]
+
+        def write(generation):
+            for c, dtype in KEY_DTYPES.items():
+                np.save(os.path.join(generation, f'{c}.npy'), df[c].to_numpy(dtype=dtype))
+            for c in columns:
+                np.save(os.path.join(generation, f'{c}.npy'), df[c].to_numpy())  # 일수는 정수, 나머지는 float64 그대로
+            with open(os.path.join(generation, 'columns.txt'), 'w', encoding='utf-8') as f:
+                f.write('\n'.join(columns))
+
+        write_generation(os.path.join(self.root, period_type), write)
+        return len(df)
+
+    def query(self, period_type, stn_ids=None, years=None, periods=None, columns=None):
+        """집계 조회
+
+        period_type: 'monthly' 또는 'weekly'
+        stn_ids: 지점코드 목록 (None이면 전체)
+        years: (시작 연도, 끝 연도) 포함 범위 (None이면 전체, 주차별은 ISO 연도)
+        periods: 월 또는 ISO 주 목록 (None이면 전체)
+        columns: 집계 컬럼 (None이면 전체) - 결과 앞에는 키 컬럼이 붙는다
+        """
+        generation = self._current(period_type)
+        if generation is None:
+            raise FileNotFoundError(f"{os.path.join(self.root, period_type)}에 집계 저장소가 없습니다.")
+        columns = self.columns(period_type) if columns is None else list(columns)
+
+        def load(c):
+            return np.load(os.path.join(generation, f'{c}.npy'), mmap_mode='r')
+
+        stn_id, year = load('stn_id'), load('year')
+
+        # 지점별 연속 구간 → (연도 범위로 좁힌) 행 번호 구간
+        codes = np.unique(stn_id) if stn_ids is None else np.asarray(sorted(stn_ids))
+        starts = np.searchsorted(stn_id, codes, side='left')
+        stops = np.searchsorted(stn_id, codes, side='right')
+        spans = []
+        for lo, hi in zip(starts, stops):
+            if years is not None and lo < hi:
+                lo, hi = (lo + np.searchsorted(year[lo:hi], years[0], side='left'),
+                          lo + np.searchsorted(year[lo:hi], years[1], side='right'))
+            if lo < hi:
+                spans.append(np.arange(lo, hi))
+        rows = np.concatenate(spans) if spans else np.array([], dtype='int64')
+
+        if periods is not None:
+            rows = rows[np.isin(load('period')[rows], periods)]
+
+        result = pd.DataFrame({c: load(c)[rows] for c in KEY_COLUMNS + columns})
+        return result.rename(columns={'period': PERIOD_KEYS[period_type]})
+
+
+def build_store(stations, output_path, period_types=tuple(PERIOD_KEYS)):
+    """지점별 집계 CSV(output/<지점>/...)를 모아 저장소를 다시 만들고, 기간 종류별 행 수 반환"""
+    store = AggregateStore(os.path.join(output_path, AGGREGATE_STORE_DIR))
+    counts = {}
+    for period_type in period_types:
+        period_key = PERIOD_KEYS[period_type]
+        frames = []
+        for index, station in stations.iterrows():
+            path = output_file_path(output_path, station['지점코드'], station['지점명'], period_type)
+            if not os.path.exists(path):
+                continue
+            # 첫 컬럼은 to_csv가 남긴 인덱스
+            df = pd.read_csv(path, index_col=0, float_precision='round_trip')
+            if period_type == 'weekly':
+                df['year'] = output_partitions(df, period_key).get_level_values(0)
+            frames.append(df.rename(columns={period_key: 'period'}).assign(stn_id=station['지점코드']))
+        if not frames:
+            continue
+
+        df = pd.concat(frames, ignore_index=True)
+        counts[period_type] = store.write(period_type, df[KEY_COLUMNS + [c for c in df.columns if c not in KEY_DTYPES]])
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='전 지점 월/주차 집계 저장소 만들기/조회')
+    parser.add_argument('--output', default='./output', help='집계 출력 디렉터리')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    sub.add_parser('build', help='output/<지점>/ 집계 CSV로 저장소 다시 만들기')
+
+    query = sub.add_parser('query', help='지점/연도/기간으로 잘라 CSV로 출력')
+    query.add_argument('period_type', choices=list(PERIOD_KEYS))
+    query.add_argument('--stations', nargs='+', type=int, help='지점코드 (기본: 전체)')
+    query.add_argument('--years', nargs=2, type=int, metavar=('START', 'END'))
+    query.add_argument('--periods', nargs='+', type=int, help='월 또는 ISO 주 (기본: 전체)')
+    query.add_argument('--columns', nargs='+', help='집계 컬럼 (기본: 전체)')
+    query.add_argument('--out', help='저장할 CSV 경로 (기본: 표준 출력)')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        stations = pd.read_csv('./input/지점코드.csv')
+        counts = build_store(stations, args.output)
+        print(', '.join(f'{period_type} {n:,}행' for period_type, n in counts.items()))
+        return
+
+    store = AggregateStore(os.path.join(args.output, AGGREGATE_STORE_DIR))
+    t0 = time.perf_counter()
+    result = store.query(args.period_type, args.stations, args.years, args.periods, args.columns)
+    elapsed = time.perf_counter() - t0
+
+    result.to_csv(args.out if args.out else sys.stdout, index=False, encoding='utf-8-sig' if args.out else None)
+    print(f"{len(result):,}행, {elapsed * 1000:.1f}ms", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
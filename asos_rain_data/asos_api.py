@@ -0,0 +1,138 @@
+import time
+import json
+import random
+import threading
+from datetime import datetime, timedelta
+from urllib.parse import quote_plus, urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+
+URL = 'http://apis.data.go.kr/1360000/AsosDalyInfoService/getWthrDataList'
+SERVICE_KEY = 'HOhrXN4295f2VXKpOJc4gvpLkBPC/i97uWk8PfrUIONlI7vRB9ij088/F5RvIjZSz/PUFjJ4zkMjuBkbtMHqUg=='
+HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 6.3; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/63.0.3239.132 Safari/537.36'}
+
+MAX_ROWS_PER_PAGE = 999  # 한 페이지 최대 행 수
+MAX_DAYS_PER_REQUEST = MAX_ROWS_PER_PAGE  # 요청 하나에 담는 최대 일수 (일자료는 하루 한 행이라 한 페이지에 다 들어온다)
+NO_DATA_CODE = '03'  # 해당 기간 자료 없음
+
+DEFAULT_WORKERS = 8  # 동시 요청 수
+MAX_REQUESTS_PER_SEC = 10  # 전역 초당 요청 상한 (0이면 제한 없음)
+MAX_RETRIES = 4
+RETRY_BACKOFF_BASE = 1.0  # 초
+RETRY_BACKOFF_MAX = 30.0  # 초
+
+
+class RateLimiter:
+    """여러 스레드가 공유하는 전역 요청 속도 제한기"""
+
+    def __init__(self, max_per_sec):
+        self.interval = 1.0 / max_per_sec if max_per_sec > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_time = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            wait_time = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.interval
+
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+
+def plan_spans(start_dt, end_dt, max_days=MAX_DAYS_PER_REQUEST):
+    """기간(YYYYMMDD~YYYYMMDD)을 max_days일 이하의 요청 구간 목록으로 나눔"""
+    start = datetime.strptime(start_dt, '%Y%m%d')
+    end = datetime.strptime(end_dt, '%Y%m%d')
+
+    spans = []
+    while start <= end:
+        span_end = min(end, start + timedelta(days=max_days - 1))
+        spans.append((start.strftime('%Y%m%d'), span_end.strftime('%Y%m%d')))
+        start = span_end + timedelta(days=1)
+    return spans
+
+
+def consecutive_runs(years):
+    """연도 목록을 연속 구간으로 묶음 ([1984, 1985, 1990] → [[1984, 1985], [1990]])"""
+    runs = []
+    for y in sorted(years):
+        if runs and y == runs[-1][-1] + 1:
+            runs[-1].append(y)
+        else:
+            runs.append([y])
+    return runs
+
+
+class AsosClient:
+    """ASOS 일자료 API 클라이언트
+
+    keep-alive 세션 하나를 여러 스레드가 공유하고, 전역 속도 제한과 재시도(지수 백오프 + 지터)를 적용한다.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_requests_per_sec=MAX_REQUESTS_PER_SEC,
+                 max_retries=MAX_RETRIES):
+        self.max_retries = max_retries
+        self.rate_limiter = RateLimiter(max_requests_per_sec)
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, workers))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get_daily_range(self, stn_id, start_dt, end_dt):
+        """여러 해에 걸친 기간의 일자료 item 목록 - 최대 MAX_DAYS_PER_REQUEST일씩 묶어 요청"""
+        items = []
+        for span_start, span_end in plan_spans(start_dt, end_dt):
+            items.extend(self.get_daily(stn_id, span_start, span_end))
+        return items
+
+    def get_daily(self, stn_id, start_dt, end_dt, num_rows=MAX_ROWS_PER_PAGE):
+        """지점의 기간(YYYYMMDD~YYYYMMDD) 일자료 item 목록 - totalCount만큼 페이지를 넘겨 받는다"""
+        items, total_count = self._request_page(stn_id, start_dt, end_dt, num_rows, 1)
+
+        page_no = 1
+        while len(items) < total_count:
+            page_no += 1
+            page_items, _ = self._request_page(stn_id, start_dt, end_dt, num_rows, page_no)
+            if not page_items:
+                break
+            items.extend(page_items)
+        return items
+
+    def _request_page(self, stn_id, start_dt, end_dt, num_rows, page_no):
+        params = f'?{quote_plus("ServiceKey")}={SERVICE_KEY}&' + urlencode({
+            quote_plus("pageNo"): str(page_no),
+            quote_plus("numOfRows"): str(num_rows),
+            quote_plus("dataType"): "JSON",
+            quote_plus("dataCd"): "ASOS",
+            quote_plus("dateCd"): "DAY",
+            quote_plus("startDt"): start_dt,
+            quote_plus("endDt"): end_dt,
+            quote_plus("stnIds"): f"{stn_id}"
+        })
+        return self._request(URL + params)
+
+    def _request(self, url):
+        """(items, totalCount) 반환"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.rate_limiter.wait()
+                result = self.session.get(url, timeout=30)
+                result.raise_for_status()
+                js = json.loads(result.content)
+                if js['response']['header']['resultCode'] == NO_DATA_CODE:
+                    return [], 0
+
+                body = js['response']['body']
+                items = body['items']['item']
+                return items, int(body.get('totalCount', len(items)))
+            except (requests.exceptions.RequestException, KeyError, ValueError, TypeError):
+                # 과부하 시에는 JSON 대신 XML 오류 응답이 오므로 파싱 실패도 재시도
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** attempt)))
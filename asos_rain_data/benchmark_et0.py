@@ -0,0 +1,97 @@
+import math
+import time
+
+import numpy as np
+import pandas as pd
+
+from et0 import pm_frame
+
+# 기존 pm_weather(지점별, Series.apply 기반)와 et0 모듈(전 지점 한 번에)의 속도/결과 비교
+# 실행: python benchmark_et0.py  (input/지점코드.csv의 전 지점 × YEARS년 합성 일자료 사용)
+
+YEARS = 40
+SEED = 0
+
+
+def legacy_pm(df, latitude, altitude):
+    """기존 crawling_data.pm_weather의 계산 (비교를 위해 day 대신 doy 사용)"""
+    lati = latitude
+    alti = altitude
+    height = 10
+
+    u_2 = df['wind'] * 4.87 / np.log(67.8 * height - 5.42)
+    P = 101.3 * ((293 - 0.0065 * alti) / 293) ** 5.26
+    delta = df['tavg'].apply(lambda x: 4098 * (0.6108 * np.exp((17.27 * x) / (x + 237.3))) / (x + 237.3) ** 2)
+    gamma = 0.665 * 10 ** (-3) * P
+    e_s = df['tavg'].apply(lambda x: 0.6108 * np.exp((17.27 * x) / (x + 237.3)))
+    e_a = df['humid'] / 100 * e_s
+    e = e_s - e_a
+    doi = df['doy']
+    dr = doi.apply(lambda x: 1 + 0.033 * np.cos(2 * 3.141592 / 365 * x))
+    small_delta = doi.apply(lambda x: 0.409 * np.sin(2 * 3.141592 / 365 * x - 1.39))
+    theta = lati * math.pi / 180
+    w_s = np.arccos(-np.tan(theta) * small_delta.apply(lambda x: np.tan(x)))
+
+    Ra = 24 * 60 / math.pi * 0.082 * dr * \
+         (w_s * small_delta.apply(lambda x: math.sin(x)) *
+          np.sin(theta) +
+          np.cos(theta) *
+          small_delta.apply(lambda x: math.cos(x)) *
+          w_s.apply(lambda x: math.sin(x)))
+    N = 24 / math.pi * w_s
+    Rs = (0.25 + 0.5 * df['sunhours'] / N) * Ra
+    Rso = (0.75 + 2 * 10 ** (-5) * alti) * Ra
+    Rs_Rso = Rs / Rso
+    R_ns = 0.77 * Rs
+    R_nl = 4.903 * 10 ** (-9) * (df['tavg'] + 273.16) ** 4 * (0.34 - 0.14 * e_a ** (0.5)) * (
+            1.35 * Rs_Rso - 0.35)
+    ET = ((0.408) * (delta) * (R_ns - R_nl) + (gamma) * (900 / (df['tavg'] + 273)) * u_2 * (e)) / (
+            delta + gamma * (1 + 0.34 * u_2))
+    return R_ns, ET
+
+
+def synthetic_daily(stations, years):
+    """지점 × 연도 합성 일자료 (지점별 위도/고도 컬럼 포함)"""
+    rng = np.random.default_rng(SEED)
+    dates = pd.date_range('1985-01-01', periods=365 * years, freq='D')
+    frames = []
+    for station in stations.itertuples(index=False):
+        n = len(dates)
+        frames.append(pd.DataFrame({
+            'stn_id': station.지점코드,
+            'doy': dates.dayofyear,
+            'tavg': rng.uniform(-10, 30, n),
+            'humid': rng.uniform(20, 100, n),
+            'wind': rng.uniform(0, 8, n),
+            'sunhours': rng.uniform(0, 12, n),
+            'latitude': station.위도,
+            'altitude': station.고도,
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def main():
+    stations = pd.read_csv('./input/지점코드.csv', encoding='utf-8-sig')
+    daily = synthetic_daily(stations, YEARS)
+    print(f"지점 {len(stations)}개 × {YEARS}년 = {len(daily):,}일")
+
+    t0 = time.perf_counter()
+    legacy = [legacy_pm(group, group['latitude'].iloc[0], group['altitude'].iloc[0])
+              for _, group in daily.groupby('stn_id', sort=False)]
+    legacy_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    batched = pm_frame(daily)
+    batched_time = time.perf_counter() - t0
+
+    legacy_r_ns = pd.concat([r for r, _ in legacy]).sort_index()
+    legacy_et0 = pd.concat([e for _, e in legacy]).sort_index()
+    # 기존 코드는 pi를 3.141592로 잘라 써서 미세한 차이가 난다
+    print(f"R_ns 최대 차이: {np.nanmax(np.abs(legacy_r_ns - batched['r_ns'])):.2e}")
+    print(f"ET0  최대 차이: {np.nanmax(np.abs(legacy_et0 - batched['et0'])):.2e}")
+    print(f"기존 (지점별 apply): {legacy_time:.2f}s")
+    print(f"벡터화 (전 지점 한 번): {batched_time:.3f}s  → {legacy_time / batched_time:.0f}배")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+import os
+import argparse
+import logging
+
+import numpy as np
+import pandas as pd
+
+from processing_monthly_weekly import output_file_path, output_partitions
+
+logger = logging.getLogger(__name__)
+
+# 지점별 월/주차 집계(output/<지점>/<지점>_<이름>_<monthly|weekly>.csv)를 한반도 위경도 격자로 보간
+#
+# 격자 셀마다 가까운 K_NEAREST개 지점의 역거리 가중치(IDW)를 한 번만 계산해 (셀 × 지점) 행렬 W로 두고,
+# 모든 (연도, 기간)의 지점 값 행렬 V (지점 × 기간)에 W @ V 한 번으로 격자를 만든다.
+# 결측 지점은 가중치 합으로 다시 나눠(W @ 관측여부) 남은 지점끼리 정규화한다.
+# 지점이 74개뿐이라 W는 dense 배열로 두어도 작고(0.1° 격자 약 4천 셀 × 74), 셀마다 K개 외에는 0이다.
+
+GRID_DIR = 'grid'
+LAT_RANGE = (33.0, 38.7)  # 제주 남단 ~ 강원 북단
+LON_RANGE = (124.5, 131.0)  # 백령도 ~ 울릉도
+GRID_STEP = 0.1  # 도
+K_NEAREST = 8
+IDW_POWER = 2
+EARTH_RADIUS_KM = 6371.0
+
+DEFAULT_COLUMNS = ['rainy_day', 'total_rain', 'tavg', 'tmin_avg', 'tmax_avg']
+PERIOD_KEYS = {'monthly': 'month', 'weekly': 'week'}
+
+
+def grid_axes(step=GRID_STEP, lat_range=LAT_RANGE, lon_range=LON_RANGE):
+    """격자 셀 중심 위도/경도 축"""
+    lat = np.round(np.arange(lat_range[0], lat_range[1] + step / 2, step), 6)
+    lon = np.round(np.arange(lon_range[0], lon_range[1] + step / 2, step), 6)
+    return lat, lon
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """두 좌표 배열 사이 대원 거리 (km, 브로드캐스트)"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def idw_weights(station_lat, station_lon, lat, lon, k=K_NEAREST, power=IDW_POWER):
+    """(격자 셀 × 지점) IDW 가중치 행렬 - 셀마다 가까운 k개 지점만 0이 아니고 행 합은 1
+
+    셀 중심이 지점과 겹치면 그 지점 값을 그대로 쓴다.
+    """
+    grid_lat, grid_lon = np.meshgrid(lat, lon, indexing='ij')
+    distance = haversine_km(grid_lat.ravel()[:, None], grid_lon.ravel()[:, None],
+                            np.asarray(station_lat)[None, :], np.asarray(station_lon)[None, :])
+
+    k = min(k, distance.shape[1])
+    nearest = np.argpartition(distance, k - 1, axis=1)[:, :k]
+    rows = np.arange(len(distance))[:, None]
+    nearest_distance = distance[rows, nearest]
+
+    with np.errstate(divide='ignore'):
+        inverse = 1.0 / nearest_distance ** power
+    exact = np.isinf(inverse)
+    inverse = np.where(exact.any(axis=1, keepdims=True), exact.astype(float), inverse)
+
+    weights = np.zeros_like(distance)
+    weights[rows, nearest] = inverse / inverse.sum(axis=1, keepdims=True)
+    return weights
+
+
+def load_station_values(stations, suffix, columns, output_path, years=None):
+    """지점별 집계 CSV를 모아 컬럼마다 ((연도, 기간) × 지점코드) 표로 반환
+
+    월별은 (연도, 월), 주차별은 output_partitions와 같은 ISO (연도, 주)가 키다.
+    (출력 CSV의 year는 주 첫날의 달력 연도라 12월 말에 시작하는 1주차가 앞 해로 들어가 있다)
+    """
+    period_key = PERIOD_KEYS[suffix]
+    frames = []
+    for index, station in stations.iterrows():
+        path = output_file_path(output_path, station['지점코드'], station['지점명'], suffix)
+        if not os.path.exists(path):
+            logger.warning(f"{path} 없음 - 격자에서 제외")
+            continue
+        df = pd.read_csv(path, index_col=0, usecols=lambda c: c in ['Unnamed: 0', 'year', 'doy', period_key] + columns)
+        df.index = output_partitions(df, period_key).set_names(['year', period_key])
+        if df.index.has_duplicates:
+            raise ValueError(f"{path}: (연도, {period_key})가 중복된 행이 있습니다.")
+        if years is not None:
+            year = df.index.get_level_values('year')
+            df = df[(year >= years[0]) & (year <= years[1])]
+        frames.append(df[columns].assign(stn_id=station['지점코드']).set_index('stn_id', append=True))
+
+    if not frames:
+        return {c: pd.DataFrame() for c in columns}
+    values = pd.concat(frames)
+    return {c: values[c].unstack('stn_id').sort_index() for c in columns}
+
+
+def grid_values(weights, values):
+    """지점 값 표(기간 × 지점)를 격자로 - 모든 기간을 행렬곱 한 번으로 (기간 × 셀) 반환"""
+    v = values.to_numpy(dtype=float).T  # 지점 × 기간
+    observed = ~np.isnan(v)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        gridded = (weights @ np.where(observed, v, 0.0)) / (weights @ observed)
+    return gridded.T
+
+
+def cal_grid(stations, suffix, output_path, columns=DEFAULT_COLUMNS, years=None,
+             step=GRID_STEP, k=K_NEAREST, power=IDW_POWER):
+    """지점 집계를 격자로 보간해 output/grid/<suffix>_<컬럼>.npz로 저장, 저장한 파일 목록 반환
+
+    npz 내용: lat, lon, year, period, values (기간 × 위도 × 경도, float32, (year, period)는 중복 없음),
+              normals (기간번호별 연평균 × 위도 × 경도, float32), normal_period
+    """
+    lat, lon = grid_axes(step)
+    tables = load_station_values(stations, suffix, columns, output_path, years)
+    coords = stations.set_index('지점코드')[['위도', '경도']]
+
+    grid_dir = os.path.join(output_path, GRID_DIR)
+    os.makedirs(grid_dir, exist_ok=True)
+
+    weights_cache = {}
+    saved = []
+    for c, table in tables.items():
+        if table.empty:
+            continue
+        # 컬럼마다 지점 구성이 같으면 가중치 행렬을 다시 만들지 않는다
+        stn_ids = tuple(table.columns)
+        if stn_ids not in weights_cache:
+            weights_cache[stn_ids] = idw_weights(coords.loc[list(stn_ids), '위도'], coords.loc[list(stn_ids), '경도'],
+                                                 lat, lon, k, power)
+        if table.index.has_duplicates:
+            raise ValueError(f"[{suffix}] {c}: 격자 (연도, 기간)이 중복됩니다.")
+        gridded = grid_values(weights_cache[stn_ids], table).reshape(len(table), len(lat), len(lon))
+
+        periods = table.index.get_level_values(1).to_numpy()
+        normal_period = np.unique(periods)
+        with np.errstate(invalid='ignore'):
+            normals = np.stack([np.nanmean(gridded[periods == p], axis=0) for p in normal_period])
+
+        path = os.path.join(grid_dir, f'{suffix}_{c}.npz')
+        np.savez_compressed(path + '.tmp.npz', lat=lat, lon=lon,
+                            year=table.index.get_level_values(0).to_numpy(), period=periods,
+                            values=gridded.astype('float32'), normals=normals.astype('float32'),
+                            normal_period=normal_period)
+        os.replace(path + '.tmp.npz', path)
+        saved.append(path)
+        logger.info(f"[{suffix}] {c}: 지점 {len(stn_ids)}개, 기간 {len(table)}개 → {path}")
+    return saved
+
+
+def main():
+    parser = argparse.ArgumentParser(description='지점별 월/주차 집계를 한반도 위경도 격자로 보간 (IDW)')
+    parser.add_argument('--periods', nargs='+', choices=list(PERIOD_KEYS), default=list(PERIOD_KEYS))
+    parser.add_argument('--columns', nargs='+', default=DEFAULT_COLUMNS)
+    parser.add_argument('--years', nargs=2, type=int, metavar=('START', 'END'))
+    parser.add_argument('--step', type=float, default=GRID_STEP, help='격자 간격 (도)')
+    parser.add_argument('--k', type=int, default=K_NEAREST, help='셀마다 사용할 가까운 지점 수')
+    parser.add_argument('--power', type=float, default=IDW_POWER, help='역거리 가중치 지수')
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    stations = pd.read_csv('./input/지점코드.csv')
+    for suffix in args.periods:
+        cal_grid(stations, suffix, './output', args.columns, args.years, args.step, args.k, args.power)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from daily_store import DailyStore, STORE_DIR, COLUMN_DTYPES
+
+# 분석용 메모리 절약형 일자료
+# - stn_id는 category, year/doy는 int16, month/day는 int8, 관측값은 float32, QC 플래그는 int8
+# - 행마다 반복되던 위도/경도/고도는 지점 테이블(station_table)로 빼고 필요할 때만 join_stations로 붙인다
+# 저장소의 컬럼 배열을 바로 작은 형으로 바꿔 읽으므로 float64 프레임을 한 번도 만들지 않는다.
+
+STATION_COLUMNS = ['latitude', 'longitude', 'altitude']
+COMPACT_DTYPES = {c: 'float32' if dtype == 'float64' else dtype
+                  for c, dtype in COLUMN_DTYPES.items() if c not in STATION_COLUMNS}
+
+
+def load_compact(store, stn_ids=None, years=None, columns=None):
+    """일자료를 작은 형으로 조회 (인자는 DailyStore.load와 같고, 위치 컬럼은 빠진다)"""
+    stn_ids = store.station_ids() if stn_ids is None else list(stn_ids)
+    columns = list(COMPACT_DTYPES) if columns is None else [c for c in columns if c in COMPACT_DTYPES]
+
+    code_of = {stn_id: code for code, stn_id in enumerate(stn_ids)}
+    chunks = {c: [] for c in columns}
+    codes = []
+    for stn_id, arrays in store.iter_slices(stn_ids, years, columns + ['year']):
+        for c in columns:
+            chunks[c].append(np.asarray(arrays[c], dtype=COMPACT_DTYPES[c]))
+        codes.append(np.full(len(arrays['year']), code_of[stn_id], dtype='int16'))
+
+    stn_id = pd.Categorical.from_codes(np.concatenate(codes) if codes else np.array([], dtype='int16'),
+                                       categories=stn_ids)
+    data = {c: np.concatenate(chunks[c]) if chunks[c] else np.array([], dtype=COMPACT_DTYPES[c])
+            for c in columns}
+    return pd.DataFrame({'stn_id': stn_id, **data})
+
+
+def station_table(store, stn_ids=None, stations=None):
+    """지점별 상수 테이블 (인덱스 stn_id, 위도/경도/고도 float64 + 지점명)
+
+    stations(지점코드.csv)를 주면 지점명도 붙인다. 위치는 저장소 자료의 첫 행 값.
+    """
+    stn_ids = store.station_ids() if stn_ids is None else list(stn_ids)
+    rows = [{'stn_id': stn_id, **{c: float(arrays[c][0]) for c in STATION_COLUMNS}}
+            for stn_id, arrays in store.iter_slices(stn_ids, columns=STATION_COLUMNS)]
+
+    table = pd.DataFrame(rows, columns=['stn_id'] + STATION_COLUMNS).set_index('stn_id')
+    if stations is not None:
+        table['name'] = stations.set_index('지점코드')['지점명'].reindex(table.index)
+    return table
+
+
+def join_stations(daily, table, columns=STATION_COLUMNS):
+    """compact 일자료에 지점 상수 컬럼을 붙인 새 프레임 (stn_id 카테고리 코드로 한 번에 가져온다)"""
+    categories = daily['stn_id'].cat.categories
+    codes = daily['stn_id'].cat.codes.to_numpy()
+    lookup = table.reindex(categories)
+
+    joined = daily.copy()
+    for c in columns:
+        values = lookup[c].to_numpy()
+        joined[c] = np.where(codes >= 0, values[codes], np.nan).astype(values.dtype)
+    return joined
+
+
+def memory_footprint(df):
+    """프레임이 차지하는 메모리 (바이트, object/category 포함)"""
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+def main():
+    # 저장소 전체를 기존 방식(float64)과 compact 방식으로 읽어 메모리 비교: python compact_daily.py [download_weather]
+    input_path = sys.argv[1] if len(sys.argv) > 1 else 'download_weather'
+    store = DailyStore(os.path.join(input_path, STORE_DIR))
+    stations = pd.read_csv('./input/지점코드.csv')
+
+    full = store.load()
+    compact = load_compact(store)
+    table = station_table(store, stations=stations)
+
+    full_bytes = memory_footprint(full)
+    compact_bytes = memory_footprint(compact) + memory_footprint(table)
+    print(f"지점 {len(table)}개, {len(compact):,}일")
+    print(f"기존 load:    {full_bytes / 2 ** 20:8.1f} MiB")
+    print(f"compact load: {compact_bytes / 2 ** 20:8.1f} MiB (지점 테이블 포함) → {full_bytes / compact_bytes:.1f}배 작음")
+    print(compact.dtypes.value_counts().to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -1,37 +1,30 @@
 import os
-import numpy as np
-import math
-import json
-import requests
-import time
-from urllib.parse import quote_plus, urlencode
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 import pandas as pd
 import tqdm
 
+from asos_api import AsosClient, DEFAULT_WORKERS, consecutive_runs
+from daily_store import DailyStore, STORE_DIR, import_station
+from et0 import pm_frame
+from gap_fill import fill_store
+
 times = datetime.today() - timedelta(days=1)
 today = times.strftime("%m%d")
 
-def dw_weather_multiple(stations, start, end, output_path):
-    url = 'http://apis.data.go.kr/1360000/AsosDalyInfoService/getWthrDataList'
-    servicekey = 'HOhrXN4295f2VXKpOJc4gvpLkBPC/i97uWk8PfrUIONlI7vRB9ij088/F5RvIjZSz/PUFjJ4zkMjuBkbtMHqUg=='
-    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 6.3; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/63.0.3239.132 Safari/537.36'}
-
+def dw_weather_multiple(stations, start, end, output_path, workers=DEFAULT_WORKERS):
     current_year = datetime.today().year
     current_date = (datetime.today() - timedelta(days=1)).strftime('%Y%m%d')
 
+    # 지점별로 캐시가 없는 연도만 모은다
+    tasks = []
     for index, station in stations.iterrows():
         stn_id = station['지점코드']
-        latitude = station['위도']
-        longitude = station['경도']
-        altitude = station['고도']
         station_name = station['지점명']
 
-        for y in tqdm.tqdm(range(start, end + 1), desc=f"Downloading {station_name} ({stn_id})"):
-            if y != 2025:
-                end_date = current_date if y == current_year else f"{y}1231"
-            else:
-                end_date = f"{y}0131"
+        missing = {}
+        for y in range(start, min(end, current_year) + 1):
+            end_date = current_date if y == current_year else f"{y}1231"
 
             # 연도별 폴더 경로 생성
             cache_dir = os.path.join(output_path, "cache_weather", str(stn_id), str(y))
@@ -44,107 +37,158 @@ def dw_weather_multiple(stations, start, end, output_path):
                 print(f"Data for {station_name} ({stn_id}) in {y} already exists. Skipping.")
                 continue
 
-            params = f'?{quote_plus("ServiceKey")}={servicekey}&' + urlencode({
-                quote_plus("pageNo"): "1",
-                quote_plus("numOfRows"): "720",
-                quote_plus("dataType"): "JSON",
-                quote_plus("dataCd"): "ASOS",
-                quote_plus("dateCd"): "DAY",
-                quote_plus("startDt"): f"{y}0101",
-                quote_plus("endDt"): end_date,
-                quote_plus("stnIds"): f"{stn_id}"
-            })
-
-            try:
-                result = requests.get(url + params, headers=headers)
-            except:
-                time.sleep(2)
-                result = requests.get(url + params, headers=headers)
-
-            try:
-                js = json.loads(result.content)
-                weather = pd.DataFrame(js['response']['body']['items']['item'])
-            except:
+            missing[y] = (end_date, cache_filename)
+
+        if missing:
+            tasks.append((station, missing))
+
+    # 세션/속도 제한을 공유하는 작업 풀에서 지점별로 동시에 다운로드
+    client = AsosClient(workers=workers)
+    store = DailyStore(os.path.join(output_path, STORE_DIR))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(dw_weather_station, client, store, output_path, *task) for task in tasks]
+        for future in tqdm.tqdm(as_completed(futures), total=len(futures), desc="Downloading"):
+            future.result()
+
+
+def dw_weather_station(client, store, output_path, station, missing):
+    """연속된 누락 연도를 한 기간으로 묶어 요청하고, 받은 자료를 연도별 캐시 파일로 나눠 저장
+
+    missing: {연도: (해당 연도 종료일, 캐시 파일 경로)}
+    받은 자료는 일자료 저장소(daily_store)에도 추가한다.
+    """
+    stn_id = station['지점코드']
+    station_name = station['지점명']
+
+    saved = []
+    for run in consecutive_runs(missing):
+        start_date = f"{run[0]}0101"
+        end_date = missing[run[-1]][0]
+
+        try:
+            weather = pd.DataFrame(client.get_daily_range(stn_id, start_date, end_date))
+        except Exception:
+            print(f"Failed to fetch data for {station_name} ({stn_id}) in {run[0]}-{run[-1]}")
+            continue
+
+        if weather.empty:
+            print(f"Failed to fetch data for {station_name} ({stn_id}) in {run[0]}-{run[-1]}")
+            continue
+
+        tm_year = pd.to_datetime(weather['tm']).dt.year
+        for y in run:
+            year_weather = weather[tm_year == y]
+            if year_weather.empty:
                 print(f"Failed to fetch data for {station_name} ({stn_id}) in {y}")
                 continue
 
-            weather['year'] = pd.to_datetime(weather['tm']).dt.year
-            weather['month'] = pd.to_datetime(weather['tm']).dt.month
-            weather['day'] = pd.to_datetime(weather['tm']).dt.day
-
-            weather['date'] = pd.to_datetime(weather[['year', 'month', 'day']])
-            weather['doy'] = weather['date'].dt.strftime('%j')
-
-            # Selecting and renaming columns
-            li = ['year', 'month', 'day', 'doy', 'sumGsr', 'maxTa', 'minTa', 'sumRn', 'sumSmlEv',
-                  'avgTa', 'avgRhm', 'avgWs', 'maxWd', 'sumSsHr']
-            weather = weather.loc[:, li]
-            weather = weather.apply(pd.to_numeric, errors='coerce')
-            list_dfs = [weather]
-
-            # Concatenate and save
-            if list_dfs:
-                df = pd.concat(list_dfs)
-                df.columns = ['year', 'month', 'day', 'doy', 'radn', 'maxt', 'mint', 'rain', 'evap',
-                              'tavg', 'humid', 'wind', 'winddir', 'sunhours']
-
-                df = df[['year', 'month', 'day', 'doy', 'radn', 'maxt', 'mint', 'rain', 'tavg', 'humid', 'wind', 'winddir','sunhours']]
-
-                df['rain'] = df['rain'].fillna(0)
-                df['latitude'] = latitude
-                df['longitude'] = longitude
-                df['altitude'] = altitude
-                df = pm_weather(df, latitude, altitude)
-                df = interpolate_weather(df)
-
-                df.to_csv(cache_filename, index=False)
-                print(f"Saved data for station {station_name} ({stn_id}) to {cache_filename}.")
-
-def interpolate_weather(df):
-    df.interpolate(method='linear', inplace=True)
-    df.fillna(method='ffill', inplace=True)  # 전방 채우기
-    df.fillna(method='bfill', inplace=True)  # 후방 채우기
+            cache_filename = missing[y][1]
+            df = process_weather_year(year_weather.reset_index(drop=True), station)
+            df.to_csv(cache_filename, index=False)
+            saved.append(df)
+            print(f"Saved data for station {station_name} ({stn_id}) to {cache_filename}.")
+
+    if saved:
+        if store.has_station(stn_id):
+            store.append(stn_id, pd.concat(saved, ignore_index=True))
+        else:
+            # 저장소에 처음 들어가는 지점은 이전에 받아 둔 캐시 연도까지 함께 옮긴다
+            import_station(store, station, output_path)
+
+
+def dw_weather_refresh(stations, start, output_path, workers=DEFAULT_WORKERS):
+    """지점별 저장소의 마지막 날짜 다음 날부터 어제까지만 받아 이어 붙인다 (매일 갱신용)
+
+    저장소에 자료가 없는 지점은 start년 1월 1일부터 받는다. 갱신한 지점 수 반환
+    """
+    until = pd.Timestamp(datetime.today().date()) - pd.Timedelta(days=1)
+
+    client = AsosClient(workers=workers)
+    store = DailyStore(os.path.join(output_path, STORE_DIR))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(refresh_station, client, store, output_path, station, start, until)
+                   for index, station in stations.iterrows()]
+        return sum(future.result() for future in tqdm.tqdm(as_completed(futures), total=len(futures),
+                                                            desc="Refreshing"))
+
+
+def refresh_station(client, store, output_path, station, start, until):
+    """한 지점의 (마지막 날짜, until] 구간을 받아 연도별 캐시 파일과 저장소에 추가, 추가했으면 True"""
+    stn_id = station['지점코드']
+    station_name = station['지점명']
+
+    if not store.has_station(stn_id):
+        import_station(store, station, output_path)
+    last_date = store.last_date(stn_id)
+    first = last_date + pd.Timedelta(days=1) if last_date is not None else pd.Timestamp(start, 1, 1)
+    if first > until:
+        return False
+
+    try:
+        weather = pd.DataFrame(client.get_daily_range(stn_id, first.strftime('%Y%m%d'), until.strftime('%Y%m%d')))
+    except Exception:
+        print(f"Failed to fetch data for {station_name} ({stn_id}) in {first:%Y-%m-%d}~{until:%Y-%m-%d}")
+        return False
+    if weather.empty:
+        print(f"No new data for {station_name} ({stn_id}) since {first:%Y-%m-%d}")
+        return False
+
+    df = process_weather_year(weather, station)
+    for y, year_df in df.groupby('year'):
+        cache_dir = os.path.join(output_path, "cache_weather", str(stn_id), str(y))
+        os.makedirs(cache_dir, exist_ok=True)
+        append_cache(os.path.join(cache_dir, f"{stn_id}_{station_name}_{y}.csv"), year_df)
+
+    store.append(stn_id, df)
+    print(f"Appended {len(df)} days for station {station_name} ({stn_id}) up to {until:%Y-%m-%d}.")
+    return True
+
+
+def append_cache(cache_filename, df):
+    """연도 캐시 CSV에 행 추가 (같은 날짜는 새 값으로) - 임시 파일에 쓴 뒤 교체하므로 중간에 죽어도 기존 파일은 그대로"""
+    if os.path.exists(cache_filename):
+        df = pd.concat([pd.read_csv(cache_filename, encoding='utf-8-sig'), df], ignore_index=True)
+    df = df.drop_duplicates(['year', 'month', 'day'], keep='last').sort_values(['year', 'month', 'day'])
+    df.to_csv(cache_filename + '.tmp', index=False)
+    os.replace(cache_filename + '.tmp', cache_filename)
+
+
+def process_weather_year(weather, station):
+    """API 일자료(한 해치 또는 갱신 구간)를 캐시 파일 형식으로 변환"""
+    latitude = station['위도']
+    longitude = station['경도']
+    altitude = station['고도']
+
+    weather['year'] = pd.to_datetime(weather['tm']).dt.year
+    weather['month'] = pd.to_datetime(weather['tm']).dt.month
+    weather['day'] = pd.to_datetime(weather['tm']).dt.day
+
+    weather['date'] = pd.to_datetime(weather[['year', 'month', 'day']])
+    weather['doy'] = weather['date'].dt.strftime('%j')
+
+    # Selecting and renaming columns
+    li = ['year', 'month', 'day', 'doy', 'sumGsr', 'maxTa', 'minTa', 'sumRn', 'sumSmlEv',
+          'avgTa', 'avgRhm', 'avgWs', 'maxWd', 'sumSsHr']
+    weather = weather.loc[:, li]
+    weather = weather.apply(pd.to_numeric, errors='coerce')
+
+    df = weather
+    df.columns = ['year', 'month', 'day', 'doy', 'radn', 'maxt', 'mint', 'rain', 'evap',
+                  'tavg', 'humid', 'wind', 'winddir', 'sunhours']
+
+    df = df[['year', 'month', 'day', 'doy', 'radn', 'maxt', 'mint', 'rain', 'tavg', 'humid', 'wind', 'winddir','sunhours']]
+
+    df['rain'] = df['rain'].fillna(0)
+    df['latitude'] = latitude
+    df['longitude'] = longitude
+    df['altitude'] = altitude
+    # 결측 보간은 여러 해를 이어 붙인 저장소 자료에서 (gap_fill)
+    df = pm_weather(df, latitude, altitude)
     return df
 
 def pm_weather(df, latitude, altitude): ### penman-monteith eqn
-    lati = latitude
-    alti = altitude
-    height = 10
-
-    u_2 = df['wind'] * 4.87 / np.log(67.8 * height - 5.42)
-    P = 101.3 * ((293 - 0.0065 * alti) / 293) ** 5.26
-    delta = df['tavg'].apply(lambda x: 4098 * (0.6108 * np.exp((17.27 * x) / (x + 237.3))) / (x + 237.3) ** 2)
-    gamma = 0.665 * 10 ** (-3) * P
-    u_2_cal = 1 + 0.34 * u_2  # P
-    Q = delta / (delta + gamma * u_2_cal)  # Q
-    R = gamma / (delta + gamma * u_2_cal)  # R
-    S = 900 / (df['tavg'] + 273) * u_2  # S
-    e_s = df['tavg'].apply(lambda x: 0.6108 * np.exp((17.27 * x) / (x + 237.3)))
-    e_a = df['humid'] / 100 * e_s
-    e = e_s - e_a  # e_s-e_a
-    doi = df['day']  # day of year
-    dr = doi.apply(lambda x: 1 + 0.033 * np.cos(2 * 3.141592 / 365 * x))
-    small_delta = doi.apply(lambda x: 0.409 * np.sin(2 * 3.141592 / 365 * x - 1.39))
-    theta = lati * math.pi / 180
-    w_s = np.arccos(-np.tan(theta) * small_delta.apply(lambda x: np.tan(x)))
-
-    Ra = 24 * 60 / math.pi * 0.082 * dr * \
-         (w_s * small_delta.apply(lambda x: math.sin(x)) *
-          np.sin(theta) +
-          np.cos(theta) *
-          small_delta.apply(lambda x: math.cos(x)) *
-          w_s.apply(lambda x: math.sin(x)))
-    N = 24 / math.pi * w_s
-    Rs = (0.25 + 0.5 * df['sunhours'] / N) * Ra
-    Rso = (0.75 + 2 * 10 ** (-5) * alti) * Ra
-    Rs_Rso = Rs / Rso  # Rs/Rso
-    R_ns = 0.77 * Rs
-    R_nl = 4.903 * 10 ** (-9) * (df['tavg'] + 273.16) ** 4 * (0.34 - 0.14 * e_a ** (0.5)) * (
-            1.35 * Rs_Rso - 0.35)
-    G = 0
-    ET = ((0.408) * (delta) * (R_ns - R_nl - G) + (gamma) * (900 / (df['tavg'] + 273)) * u_2 * (e)) / (
-            delta + gamma * (1 + 0.34 * u_2))
-
+    # 일사량 결측은 일조시간으로 추정한 순단파복사로 채운다 (계산은 et0 모듈에서 배열 단위로)
+    R_ns = pm_frame(df, latitude, altitude)['r_ns']
     df['radn'] = df['radn'].fillna(round(R_ns, 3))
     return df
 
@@ -162,6 +206,9 @@ def main():
 
     dw_weather_multiple(stations, start, end, output_path)
 
+    # 받은 자료의 결측 보간 (pipeline.py에서는 derive 단계)
+    fill_store(DailyStore(os.path.join(output_path, STORE_DIR)), stations['지점코드'].tolist())
+
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,212 @@
+import os
+import hashlib
+import sys
+
+import numpy as np
+import pandas as pd
+
+from generations import current_generation, write_generation
+
+# 지점별 일자료 컬럼 저장소
+#
+#   <root>/<지점코드>/CURRENT          현재 세대 이름 (g<N>)
+#   <root>/<지점코드>/g<N>/<컬럼>.npy  날짜순으로 정렬된 컬럼 배열
+#
+# 컬럼마다 .npy 파일 하나라 필요한 컬럼만 memory-map으로 읽고(컬럼 선택),
+# 지점은 디렉터리, 연도는 정렬된 year 배열의 searchsorted로 잘라 읽는다(조건 선택).
+# 추가할 때는 새 세대 디렉터리에 전부 쓴 뒤 CURRENT만 os.replace로 바꾸므로 중간에 죽어도 이전 세대가 남는다 (generations 참고).
+
+STORE_DIR = 'daily_store'
+
+# 캐시 CSV와 같은 컬럼 + 보간 QC 플래그 (정수 날짜 컬럼은 작은 정수형, 관측값/위치는 float64)
+COLUMN_DTYPES = {
+    'year': 'int16',
+    'month': 'int8',
+    'day': 'int8',
+    'doy': 'int16',
+    'radn': 'float64',
+    'maxt': 'float64',
+    'mint': 'float64',
+    'rain': 'float64',
+    'tavg': 'float64',
+    'humid': 'float64',
+    'wind': 'float64',
+    'winddir': 'float64',
+    'sunhours': 'float64',
+    'latitude': 'float64',
+    'longitude': 'float64',
+    'altitude': 'float64',
+}
+DATE_COLUMNS = ['year', 'month', 'day']
+
+# 결측 보간 대상 관측값과 셀별 QC 플래그 컬럼 (gap_fill 참고)
+FILL_COLUMNS = ['radn', 'maxt', 'mint', 'tavg', 'humid', 'wind', 'sunhours']
+QC_OBSERVED = 0  # 관측값 (또는 아직 보간 전 결측)
+QC_INTERPOLATED = 1  # 앞뒤 관측값으로 선형 보간
+QC_NEAREST = 2  # 시계열 처음/끝 결측을 가장 가까운 관측값으로 채움
+QC_MISSING = 9  # 결측 구간이 길어 채우지 않음
+QC_COLUMNS = {f'{c}_qc': 'int8' for c in FILL_COLUMNS}
+COLUMN_DTYPES.update(QC_COLUMNS)
+
+
+class DailyStore:
+    """지점별 일자료 컬럼 저장소 (캐시 CSV 수천 개 대신 지점당 컬럼 파일 몇 개)"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def station_ids(self):
+        """저장된 지점코드 목록"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(int(name) for name in os.listdir(self.root)
+                      if name.isdigit() and os.path.exists(os.path.join(self.root, name, 'CURRENT')))
+
+    def has_station(self, stn_id):
+        return self._current(stn_id) is not None
+
+    def _station_dir(self, stn_id):
+        return os.path.join(self.root, str(stn_id))
+
+    def _current(self, stn_id):
+        """현재 세대 디렉터리 (없으면 None)"""
+        return current_generation(self._station_dir(stn_id))
+
+    def _read_columns(self, stn_id, columns, mmap_mode='r'):
+        generation = self._current(stn_id)
+        if generation is None:
+            return None
+
+        arrays = {}
+        for c in columns:
+            path = os.path.join(generation, f'{c}.npy')
+            if not os.path.exists(path) and c in QC_COLUMNS:
+                # QC 컬럼이 생기기 전에 만든 세대
+                length = len(np.load(os.path.join(generation, 'year.npy'), mmap_mode='r'))
+                arrays[c] = np.full(length, QC_OBSERVED, dtype=QC_COLUMNS[c])
+                continue
+            arrays[c] = np.load(path, mmap_mode=mmap_mode)
+        return arrays
+
+    def append(self, stn_id, df):
+        """일자료 행 추가 - 같은 날짜가 이미 있으면 새 값으로 교체, 저장 후 행 수 반환"""
+        new = df.reindex(columns=list(COLUMN_DTYPES)).dropna(subset=DATE_COLUMNS)
+        new[list(QC_COLUMNS)] = new[list(QC_COLUMNS)].fillna(QC_OBSERVED)
+        new = new.astype(COLUMN_DTYPES)
+
+        existing = self._read_columns(stn_id, COLUMN_DTYPES, mmap_mode=None)
+        if existing is not None:
+            new = pd.concat([pd.DataFrame(existing), new], ignore_index=True)
+
+        key = new['year'].astype(int) * 10000 + new['month'].astype(int) * 100 + new['day'].astype(int)
+        new = new.assign(_key=key).drop_duplicates('_key', keep='last').sort_values('_key')
+        self._write_generation(stn_id, new)
+        return len(new)
+
+    def _write_generation(self, stn_id, df):
+        def write(generation):
+            for column, dtype in COLUMN_DTYPES.items():
+                np.save(os.path.join(generation, f'{column}.npy'), df[column].to_numpy(dtype=dtype))
+
+        write_generation(self._station_dir(stn_id), write)
+
+    def content_hash(self, stn_id, columns=None):
+        """지점 자료의 내용 해시 (없으면 None) - 세대가 바뀌어도 내용이 같으면 같은 값"""
+        columns = list(COLUMN_DTYPES) if columns is None else list(columns)
+        arrays = self._read_columns(stn_id, columns)
+        if arrays is None:
+            return None
+
+        digest = hashlib.sha1()
+        for c in columns:
+            digest.update(c.encode())
+            digest.update(np.ascontiguousarray(arrays[c]).tobytes())
+        return digest.hexdigest()
+
+    def last_date(self, stn_id):
+        """저장된 마지막 날짜 (없으면 None)"""
+        arrays = self._read_columns(stn_id, DATE_COLUMNS)
+        if arrays is None or len(arrays['year']) == 0:
+            return None
+        return pd.Timestamp(int(arrays['year'][-1]), int(arrays['month'][-1]), int(arrays['day'][-1]))
+
+    def iter_slices(self, stn_ids=None, years=None, columns=None):
+        """지점마다 (지점코드, {컬럼: 연도 범위로 자른 memory-map 배열}) - 자료가 없는 지점은 건너뛴다
+
+        인자는 load와 같다. 배열은 읽기 전용이라 필요한 형으로 바꿔 복사해 쓴다.
+        """
+        stn_ids = self.station_ids() if stn_ids is None else stn_ids
+        columns = list(COLUMN_DTYPES) if columns is None else list(columns)
+
+        for stn_id in stn_ids:
+            arrays = self._read_columns(stn_id, set(columns) | {'year'})
+            if arrays is None:
+                continue
+
+            lo, hi = 0, len(arrays['year'])
+            if years is not None:
+                lo = int(np.searchsorted(arrays['year'], years[0], side='left'))
+                hi = int(np.searchsorted(arrays['year'], years[1], side='right'))
+            if lo == hi:
+                continue
+
+            yield stn_id, {c: arrays[c][lo:hi] for c in columns}
+
+    def load(self, stn_ids=None, years=None, columns=None):
+        """일자료 조회
+
+        stn_ids: 지점코드 목록 (None이면 전체)
+        years: (시작 연도, 끝 연도) 포함 범위 (None이면 전체)
+        columns: 읽을 컬럼 (None이면 전체) - 결과에는 stn_id 컬럼이 앞에 붙는다
+        """
+        columns = list(COLUMN_DTYPES) if columns is None else list(columns)
+
+        frames = []
+        for stn_id, arrays in self.iter_slices(stn_ids, years, columns):
+            frame = pd.DataFrame({c: np.array(arrays[c]) for c in columns})
+            frame.insert(0, 'stn_id', stn_id)
+            frames.append(frame)
+
+        if not frames:
+            return pd.DataFrame({'stn_id': pd.Series(dtype='int64'),
+                                 **{c: pd.Series(dtype=COLUMN_DTYPES[c]) for c in columns}})
+        return pd.concat(frames, ignore_index=True)
+
+
+def import_station(store, station, input_path):
+    """한 지점의 캐시 CSV(cache_weather/<지점>/<연도>/...)를 모두 모아 저장소에 넣고, 넣었으면 True"""
+    station_code = station['지점코드']
+    station_name = station['지점명']
+
+    station_dir = os.path.join(input_path, "cache_weather", str(station_code))
+    years = sorted(int(y) for y in os.listdir(station_dir) if y.isdigit()) if os.path.isdir(station_dir) else []
+
+    frames = []
+    for y in years:
+        cache_filename = os.path.join(station_dir, str(y), f"{station_code}_{station_name}_{y}.csv")
+        if os.path.exists(cache_filename):
+            frames.append(pd.read_csv(cache_filename, encoding='utf-8-sig'))
+
+    if not frames:
+        return False
+    store.append(station_code, pd.concat(frames, ignore_index=True))
+    return True
+
+
+def import_cache(store, stations, input_path):
+    """여러 지점의 캐시 CSV를 저장소로 옮기고, 넣은 지점 수 반환"""
+    return sum(import_station(store, station, input_path) for index, station in stations.iterrows())
+
+
+def main():
+    # 기존 캐시 CSV를 저장소로 옮기기: python daily_store.py [download_weather]
+    input_path = sys.argv[1] if len(sys.argv) > 1 else 'download_weather'
+    stations = pd.read_csv('./input/지점코드.csv')
+
+    store = DailyStore(os.path.join(input_path, STORE_DIR))
+    imported = import_cache(store, stations, input_path)
+    print(f"{imported}개 지점을 {store.root}에 저장했습니다.")
+
+
+if __name__ == '__main__':
+    main()
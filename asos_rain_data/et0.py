@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+# FAO-56 Penman-Monteith 일별 기준증발산량(ET0)과 일사량 계산
+# 모든 함수는 스칼라/배열을 그대로 받아 브로드캐스팅하므로, 여러 지점을 한 번에 쌓은 배열도 한 번에 계산한다.
+
+WIND_HEIGHT = 10  # 풍속계 높이 (m)
+SOLAR_CONSTANT = 0.082  # MJ m-2 min-1
+STEFAN_BOLTZMANN = 4.903e-9  # MJ K-4 m-2 day-1
+ALBEDO = 0.23
+
+
+def saturation_vapour_pressure(tavg):
+    """포화수증기압 e_s (kPa)"""
+    return 0.6108 * np.exp(17.27 * tavg / (tavg + 237.3))
+
+
+def vapour_pressure_slope(tavg):
+    """포화수증기압 곡선의 기울기 delta (kPa/℃)"""
+    return 4098 * saturation_vapour_pressure(tavg) / (tavg + 237.3) ** 2
+
+
+def psychrometric_constant(altitude):
+    """건습계 상수 gamma (kPa/℃)"""
+    pressure = 101.3 * ((293 - 0.0065 * altitude) / 293) ** 5.26
+    return 0.665e-3 * pressure
+
+
+def wind_at_2m(wind, height=WIND_HEIGHT):
+    """관측 높이 풍속을 2 m 풍속으로 환산"""
+    return wind * 4.87 / np.log(67.8 * height - 5.42)
+
+
+def extraterrestrial_radiation(doy, latitude):
+    """대기외 일사량 Ra (MJ/m²/day)와 가조시간 N (hr)"""
+    doy = np.asarray(doy, dtype=float)
+    theta = np.radians(latitude)
+    dr = 1 + 0.033 * np.cos(2 * np.pi / 365 * doy)
+    small_delta = 0.409 * np.sin(2 * np.pi / 365 * doy - 1.39)
+    w_s = np.arccos(np.clip(-np.tan(theta) * np.tan(small_delta), -1, 1))
+
+    ra = 24 * 60 / np.pi * SOLAR_CONSTANT * dr * (
+            w_s * np.sin(small_delta) * np.sin(theta) + np.cos(theta) * np.cos(small_delta) * np.sin(w_s))
+    n = 24 / np.pi * w_s
+    return ra, n
+
+
+def penman_monteith(tavg, humid, wind, sunhours, doy, latitude, altitude, height=WIND_HEIGHT):
+    """순단파복사 R_ns와 기준증발산량 ET0 (mm/day)
+
+    latitude, altitude는 스칼라(한 지점)나 행마다 값이 있는 배열(여러 지점) 모두 가능하다.
+    """
+    tavg = np.asarray(tavg, dtype=float)
+    u_2 = wind_at_2m(np.asarray(wind, dtype=float), height)
+    delta = vapour_pressure_slope(tavg)
+    gamma = psychrometric_constant(np.asarray(altitude, dtype=float))
+
+    e_s = saturation_vapour_pressure(tavg)
+    e_a = np.asarray(humid, dtype=float) / 100 * e_s
+
+    ra, n = extraterrestrial_radiation(doy, latitude)
+    rs = (0.25 + 0.5 * np.asarray(sunhours, dtype=float) / n) * ra
+    rso = (0.75 + 2e-5 * altitude) * ra
+    r_ns = (1 - ALBEDO) * rs
+    r_nl = STEFAN_BOLTZMANN * (tavg + 273.16) ** 4 * (0.34 - 0.14 * np.sqrt(e_a)) * (1.35 * rs / rso - 0.35)
+    g = 0
+
+    et0 = (0.408 * delta * (r_ns - r_nl - g) + gamma * (900 / (tavg + 273)) * u_2 * (e_s - e_a)) / (
+            delta + gamma * (1 + 0.34 * u_2))
+    return r_ns, et0
+
+
+def pm_frame(df, latitude=None, altitude=None):
+    """일자료 프레임의 R_ns, ET0 계산
+
+    latitude/altitude를 주지 않으면 df의 'latitude', 'altitude' 컬럼을 행별로 사용하므로
+    여러 지점을 이어 붙인 프레임도 한 번에 계산할 수 있다.
+    """
+    latitude = df['latitude'].to_numpy(dtype=float) if latitude is None else latitude
+    altitude = df['altitude'].to_numpy(dtype=float) if altitude is None else altitude
+
+    r_ns, et0 = penman_monteith(df['tavg'].to_numpy(dtype=float), df['humid'].to_numpy(dtype=float),
+                                df['wind'].to_numpy(dtype=float), df['sunhours'].to_numpy(dtype=float),
+                                df['doy'].to_numpy(dtype=float), latitude, altitude)
+    return pd.DataFrame({'r_ns': r_ns, 'et0': et0}, index=df.index)
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+from daily_store import FILL_COLUMNS, QC_OBSERVED, QC_INTERPOLATED, QC_NEAREST, QC_MISSING
+
+# 여러 해를 이어 붙인 지점별 일자료의 결측 보간
+# - 관측값 컬럼만 (연/월/일, 위치, 강수량(결측=무강수), 풍향(각도)은 제외)
+# - 결측 구간이 MAX_GAP_DAYS일 이하일 때만 앞뒤 관측값 사이를 날짜 기준 선형 보간
+# - 시계열 처음/끝의 짧은 결측은 가장 가까운 관측값으로
+# - 채운 셀마다 <컬럼>_qc 플래그를 남긴다
+# 모든 지점을 한 프레임으로 받아 groupby ffill/bfill 몇 번으로 한 번에 계산한다.
+
+MAX_GAP_DAYS = 3
+
+
+def fill_gaps(df, columns=FILL_COLUMNS, max_gap=MAX_GAP_DAYS, by='stn_id'):
+    """지점(by)별 일자료 결측을 max_gap일 이하 구간만 채우고 <컬럼>_qc 플래그를 붙여 반환 (행 순서 유지)
+
+    이미 보간된 셀(QC 1, 2)은 관측값만으로 다시 계산하므로, 새 자료가 붙은 뒤 다시 돌려도 된다.
+    """
+    columns = [c for c in columns if c in df.columns]
+    df = df.reset_index(drop=True)
+
+    dates = pd.to_datetime(df[['year', 'month', 'day']])
+    order = np.lexsort((dates.to_numpy(), df[by].to_numpy()))
+    group = df[by].iloc[order].reset_index(drop=True)
+    t = pd.Series((dates.iloc[order].to_numpy() - np.datetime64('1970-01-01')) // np.timedelta64(1, 'D'),
+                  dtype=float)
+
+    values = df[columns].iloc[order].reset_index(drop=True)
+    qc_columns = [f'{c}_qc' for c in columns]
+    if set(qc_columns) <= set(df.columns):
+        # 지난번에 채운 값은 결측으로 되돌려 관측값만으로 다시 채운다
+        previous_qc = df[qc_columns].iloc[order].reset_index(drop=True).to_numpy()
+        values = values.where(~np.isin(previous_qc, [QC_INTERPOLATED, QC_NEAREST]))
+
+    observed = values.notna()
+    times = pd.DataFrame({c: t for c in columns}).where(observed)
+
+    grouped_values = values.groupby(group)
+    grouped_times = times.groupby(group)
+    prev_v, next_v = grouped_values.ffill(), grouped_values.bfill()
+    prev_t, next_t = grouped_times.ffill(), grouped_times.bfill()
+    first_t = t.groupby(group).transform('min').to_numpy()[:, None]
+    last_t = t.groupby(group).transform('max').to_numpy()[:, None]
+    t = t.to_numpy()[:, None]
+
+    missing = ~observed.to_numpy()
+    has_prev, has_next = prev_t.notna().to_numpy(), next_t.notna().to_numpy()
+
+    # 앞뒤 관측값 사이 결측 일수 (관측 행이 아예 없는 날도 포함)
+    interior = missing & has_prev & has_next & ((next_t - prev_t - 1).to_numpy() <= max_gap)
+    leading = missing & ~has_prev & has_next & ((next_t.to_numpy() - first_t) <= max_gap)
+    trailing = missing & has_prev & ~has_next & ((last_t - prev_t.to_numpy()) <= max_gap)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = (t - prev_t.to_numpy()) / (next_t - prev_t).to_numpy()
+    linear = prev_v.to_numpy() + (next_v - prev_v).to_numpy() * ratio
+
+    filled = values.to_numpy(dtype=float, copy=True)
+    filled[interior] = linear[interior]
+    filled[leading] = next_v.to_numpy()[leading]
+    filled[trailing] = prev_v.to_numpy()[trailing]
+
+    qc = np.full(filled.shape, QC_OBSERVED, dtype='int8')
+    qc[interior] = QC_INTERPOLATED
+    qc[leading | trailing] = QC_NEAREST
+    qc[np.isnan(filled)] = QC_MISSING
+
+    # 원래 행 순서로 되돌리기
+    inverse = np.empty_like(order)
+    inverse[order] = np.arange(len(order))
+    df[columns] = filled[inverse]
+    df[qc_columns] = qc[inverse]
+    return df
+
+
+def fill_store(store, stn_ids, max_gap=MAX_GAP_DAYS):
+    """저장소의 지점 일자료 전체를 다시 보간해 저장, 채운 셀 수 반환
+
+    보간 결과가 달라진 행만 저장소에 추가하고, 달라진 행이 없는 지점은 새 세대를 만들지 않는다.
+    """
+    daily = store.load(stn_ids)
+    if daily.empty:
+        return 0
+
+    filled = fill_gaps(daily, max_gap=max_gap)
+    columns = FILL_COLUMNS + [f'{c}_qc' for c in FILL_COLUMNS]
+    before, after = daily[columns], filled[columns]
+    changed = ~((before == after) | (before.isna() & after.isna())).all(axis=1)
+    for stn_id, station_df in filled[changed].groupby('stn_id'):
+        store.append(stn_id, station_df.drop(columns='stn_id'))
+
+    qc = filled[[f'{c}_qc' for c in FILL_COLUMNS]].to_numpy()
+    return int(np.isin(qc, [QC_INTERPOLATED, QC_NEAREST]).sum())
@@ -0,0 +1,41 @@
+import os
+import shutil
+
+# 디렉터리 하나를 통째로 바꾸는 세대(generation) 저장 (daily_store, aggregate_store가 같이 쓴다)
+#
+#   <directory>/CURRENT   현재 세대 이름 (g<N>)
+#   <directory>/g<N>/     현재 세대 파일들
+#
+# 새 세대 디렉터리에 전부 쓴 뒤 CURRENT만 os.replace로 바꾸므로,
+# 쓰는 도중에 죽어도 이전 세대가 남고 읽는 쪽은 항상 완성된 세대만 본다.
+
+
+def current_generation(directory):
+    """현재 세대 디렉터리 (없으면 None)"""
+    pointer = os.path.join(directory, 'CURRENT')
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer) as f:
+        return os.path.join(directory, f.read().strip())
+
+
+def write_generation(directory, write):
+    """새 세대 디렉터리를 만들어 write(세대 경로)로 채운 뒤 CURRENT를 바꾸고 이전 세대 삭제"""
+    os.makedirs(directory, exist_ok=True)
+
+    current = current_generation(directory)
+    number = int(os.path.basename(current)[1:]) + 1 if current is not None else 0
+    name = f'g{number}'
+    generation = os.path.join(directory, name)
+    shutil.rmtree(generation, ignore_errors=True)  # 이전에 쓰다 만 세대
+    os.makedirs(generation)
+
+    write(generation)
+
+    pointer = os.path.join(directory, 'CURRENT')
+    with open(pointer + '.tmp', 'w') as f:
+        f.write(name)
+    os.replace(pointer + '.tmp', pointer)
+
+    if current is not None:
+        shutil.rmtree(current, ignore_errors=True)
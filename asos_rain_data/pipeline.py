@@ -0,0 +1,205 @@
+import os
+import argparse
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from aggregate_store import build_store
+from climatology_grid import PERIOD_KEYS, cal_grid
+from crawling_data import dw_weather_multiple, dw_weather_refresh
+from daily_store import DailyStore, STORE_DIR, import_cache
+from gap_fill import fill_store
+from processing_monthly_weekly import ASOS_SPECS, cal_monthly_data, cal_weekly_data, output_file_path
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = 'pipeline_state.csv'  # 단계 × 지점별 마지막 지문
+
+# 기본 실행 설정 (pipeline.py와 main.py가 같이 쓴다 - 기간이 다르면 download 지문이 달라져 전 지점을 다시 받는다)
+STATIONS_FILE = './input/지점코드.csv'
+INPUT_PATH = './download_weather'
+OUTPUT_PATH = './output'
+DEFAULT_START = 1984
+DEFAULT_END = datetime.today().year
+
+
+def download_fingerprint(pipeline, stn_id):
+    # 요청 기간과 기준일(어제)이 같으면 다시 받을 것이 없다
+    yesterday = (datetime.today() - timedelta(days=1)).strftime('%Y%m%d')
+    mode = 'refresh' if pipeline.refresh else 'full'
+    return f"{mode}-{pipeline.start}-{pipeline.end}-{yesterday}"
+
+
+def run_download(pipeline, stations):
+    if pipeline.refresh:
+        # 마지막 저장 날짜 다음 날부터 어제까지만 - 바뀐 주/월 파티션만 aggregate에서 다시 계산된다
+        dw_weather_refresh(stations, pipeline.start, pipeline.input_path)
+    else:
+        dw_weather_multiple(stations, pipeline.start, pipeline.end, pipeline.input_path)
+
+
+def store_fingerprint(pipeline, stn_id):
+    return pipeline.store.content_hash(stn_id) or ''
+
+
+def run_derive(pipeline, stations):
+    # 저장소에 아직 없는 지점은 캐시 CSV에서 옮긴 뒤, 지점 전체를 한 번에 보간
+    missing = stations[~stations['지점코드'].isin(pipeline.store.station_ids())]
+    if not missing.empty:
+        import_cache(pipeline.store, missing, pipeline.input_path)
+    fill_store(pipeline.store, stations['지점코드'].tolist())
+
+
+def aggregate_fingerprint(pipeline, stn_id):
+    # 저장소 내용이 같아도 집계 기간이나 집계 항목(ASOS_SPECS)이 바뀌면 다시 집계
+    specs = hashlib.sha1(json.dumps(ASOS_SPECS, sort_keys=True).encode()).hexdigest()[:12]
+    return f"{pipeline.start}-{pipeline.end}-{specs}-{store_fingerprint(pipeline, stn_id)}"
+
+
+def run_aggregate(pipeline, stations):
+    for cal_data in (cal_monthly_data, cal_weekly_data):
+        cal_data(stations, pipeline.start, pipeline.end, pipeline.input_path, pipeline.output_path,
+                 incremental=True, workers=pipeline.workers)
+    # 전 지점 조회용 통합 저장소는 지점 CSV를 모아 통째로 다시 만든다 (수 초)
+    # 저장소 세대를 통째로 바꾸므로 --stations로 일부만 실행해도 지점코드.csv 전체로 만든다
+    build_store(pipeline.all_stations, pipeline.output_path)
+
+
+def grid_fingerprint(pipeline, stn_id):
+    # 격자가 읽는 지점 집계 CSV(월별/주차별)의 내용 해시
+    station = pipeline.all_stations.set_index('지점코드').loc[stn_id]
+    digest = hashlib.sha1()
+    for suffix in PERIOD_KEYS:
+        path = output_file_path(pipeline.output_path, stn_id, station['지점명'], suffix)
+        digest.update(suffix.encode())
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def run_grid(pipeline, stations):
+    # 격자는 전체 지점으로 한 번에 보간하므로 바뀐 지점이 하나라도 있으면 전 지점 자료로 다시 만든다
+    # (--stations로 일부만 실행해도 지점코드.csv 전체 사용)
+    for suffix in PERIOD_KEYS:
+        cal_grid(pipeline.all_stations, suffix, pipeline.output_path)
+
+
+# 단계 이름 → (선행 단계, 실행 함수, 지문 함수)
+# 지문은 단계를 실행한 뒤의 값을 기록하고, 다음 실행 때 지문이 같은 지점은 건너뛴다.
+# 지문은 각 단계가 읽는 입력(저장소 내용, 집계 설정, 집계 CSV)의 해시라 선행 단계가 입력을 실제로 바꾼
+# 지점만 다시 돈다 (download는 매일 돌아도 새 자료가 없으면 뒤 단계는 건너뛴다).
+STAGES = {
+    'download': ((), run_download, download_fingerprint),
+    'derive': (('download',), run_derive, store_fingerprint),
+    'aggregate': (('derive',), run_aggregate, aggregate_fingerprint),
+    'grid': (('aggregate',), run_grid, grid_fingerprint),
+}
+
+
+def stage_order(names):
+    """선행 단계가 먼저 오도록 정렬 (names에 없는 선행 단계는 실행하지 않는다)"""
+    ordered = []
+
+    def visit(name, path=()):
+        if name in path:
+            raise ValueError(f"단계 순환: {' → '.join(path + (name,))}")
+        for dep in STAGES[name][0]:
+            if dep in names:
+                visit(dep, path + (name,))
+        if name not in ordered:
+            ordered.append(name)
+
+    for name in names:
+        visit(name)
+    return ordered
+
+
+class Pipeline:
+    """지점 메타데이터(지점코드.csv) 기준으로 download → derive → aggregate → grid 단계를 실행
+
+    단계마다 지점별 지문을 STATE_FILE에 남겨 두고, 지문이 바뀌지 않은 지점은 건너뛴다.
+    선행 단계는 실행 순서만 정한다 - 선행 단계가 바꾼 내용은 뒤 단계의 지문(입력 해시)에 드러난다.
+    """
+
+    def __init__(self, stations, start, end, input_path, output_path, workers=1, refresh=False, all_stations=None):
+        self.stations = stations
+        # 전 지점을 한 번에 다루는 산출물(격자, 통합 집계 저장소)용 전체 지점 목록
+        self.all_stations = pd.read_csv(STATIONS_FILE) if all_stations is None else all_stations
+        self.start = start
+        self.end = end
+        self.input_path = input_path
+        self.output_path = output_path
+        self.workers = workers
+        self.refresh = refresh
+        self.store = DailyStore(os.path.join(input_path, STORE_DIR))
+        self.state_path = os.path.join(input_path, STATE_FILE)
+
+    def _read_state(self):
+        if not os.path.exists(self.state_path):
+            return {}
+        state = pd.read_csv(self.state_path, dtype={'fingerprint': str}).fillna('')
+        return {(row.stage, row.stn_id): row.fingerprint for row in state.itertuples(index=False)}
+
+    def _write_state(self, state):
+        rows = [{'stage': stage, 'stn_id': stn_id, 'fingerprint': fingerprint}
+                for (stage, stn_id), fingerprint in sorted(state.items())]
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        pd.DataFrame(rows, columns=['stage', 'stn_id', 'fingerprint']).to_csv(self.state_path + '.tmp', index=False)
+        os.replace(self.state_path + '.tmp', self.state_path)
+
+    def run(self, stage_names=tuple(STAGES), force=False):
+        """단계들을 실행하고 단계별로 실행한 지점 수 반환"""
+        state = self._read_state()
+        ran = {}  # 단계 → 이번에 실행한 지점 수
+
+        for name in stage_order(list(stage_names)):
+            _, run, fingerprint = STAGES[name]
+
+            codes = self.stations['지점코드']
+            stale = [code for code in codes if force or state.get((name, code)) != fingerprint(self, code)]
+            ran[name] = len(stale)
+            if not stale:
+                logger.info(f"[{name}] 모든 지점이 최신입니다.")
+                continue
+
+            logger.info(f"[{name}] {len(stale)}/{len(codes)}개 지점 실행")
+            run(self, self.stations[codes.isin(stale)])
+
+            for code in stale:
+                state[(name, code)] = fingerprint(self, code)
+            self._write_state(state)
+
+        return ran
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ASOS 일자료 수집 → 보간 → 월별/주차별 집계 → 격자 파이프라인')
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=list(STAGES),
+                        help='실행할 단계 (기본: 전체)')
+    parser.add_argument('--stations', nargs='+', type=int, help='처리할 지점코드 (기본: 지점코드.csv 전체)')
+    parser.add_argument('--start', type=int, default=DEFAULT_START)
+    parser.add_argument('--end', type=int, default=DEFAULT_END)
+    parser.add_argument('--workers', type=int, default=1, help='집계 단계 프로세스 수')
+    parser.add_argument('--refresh', action='store_true',
+                        help='download 단계에서 지점별 마지막 저장 날짜 이후(어제까지)만 받기')
+    parser.add_argument('--force', action='store_true', help='지문과 관계없이 모든 지점 실행')
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    stations = pd.read_csv(STATIONS_FILE)
+    if args.stations:
+        stations = stations[stations['지점코드'].isin(args.stations)]
+
+    pipeline = Pipeline(stations, args.start, args.end, INPUT_PATH, OUTPUT_PATH,
+                        workers=args.workers, refresh=args.refresh)
+    pipeline.run(args.stages, force=args.force)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,134 +1,324 @@
 import os
+import argparse
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import pandas as pd
 import tqdm
 
+from daily_store import DailyStore, STORE_DIR, import_cache
+from gap_fill import fill_store
+from threshold_stats import aggregate_specs
+
+logger = logging.getLogger(__name__)
+
+
+LOCATION_COLUMNS = ['latitude', 'longitude', 'altitude']
+YEARS_PER_CHUNK = 5  # 한 번에 메모리에 올리는 연도 수
+# 집계에 필요한 일자료 컬럼 (저장소에서 이 컬럼만 읽는다)
+AGGREGATE_COLUMNS = ['year', 'month', 'day', 'doy', 'rain', 'tavg', 'mint', 'maxt', 'humid', 'wind', 'sunhours',
+                     'radn'] + LOCATION_COLUMNS
+
+#################################################################################
+# 강우일수, 강우량 합계, 강우량 10mm 이상, 30mm 이상, 50mm 이상, 70mm 이상, 90mm 이상, 110mm 이상
+# 평균기온, 평균최고기온, 평균최저기온, 편균 기온 10-30도 사이의 합
+# 평균습도
+# 평균풍속
+#################################################################################
+# 임계값/구간 통계 (형식은 threshold_stats 참고)
+ASOS_SPECS = [
+    {'name': 'rainy_day', 'var': 'rain', 'gt': 0},  # 강수일수
+    {'name': 'tavg_10_30_between_sum', 'var': 'tavg', 'stat': 'sum', 'ge': 10, 'le': 30},  # 10도 이상 30도 이하 기온 합
+]
+ASOS_SPECS += [{'name': f'rain_more_{x * 10}', 'var': 'rain', 'gt': x * 10} for x in range(1, 12, 2)]  # 강우량 x mm 초과 일수
+for x in range(5, 11, 5):
+    ASOS_SPECS += [{'name': f'tavg_less_{x}_count', 'var': 'tavg', 'le': x},  # 기온 x 이하 일수
+                   {'name': f'tavg_less_{x}_sum', 'var': 'tavg', 'stat': 'sum', 'le': x}]  # 기온 x 이하 기온 합
+for x in range(15, 41, 5):
+    ASOS_SPECS += [{'name': f'tavg_more_{x}_count', 'var': 'tavg', 'ge': x},  # 기온 x 이상 일수
+                   {'name': f'tavg_more_{x}_sum', 'var': 'tavg', 'stat': 'sum', 'ge': x}]  # 기온 x 이상 기온 합
+
+# 그룹 첫 행 값 / 평균 / 합계로 집계할 컬럼 (출력 컬럼명 → 일자료 컬럼)
+MEAN_COLUMNS = {'tavg': 'tavg', 'tmin_avg': 'mint', 'tmax_avg': 'maxt', 'humid_avg': 'humid', 'wind_avg': 'wind'}
+SUM_COLUMNS = {'total_rain': 'rain', 'sunhours_sum': 'sunhours', 'radn_sum': 'radn'}
+
+
+# 기존 출력 파일의 컬럼 순서 (여기 없는 spec 컬럼은 뒤에 spec 순서대로 붙는다)
+OUTPUT_ORDER = ['rainy_day', 'total_rain', 'tavg', 'tmin_avg', 'tmax_avg', 'tavg_10_30_between_sum', 'humid_avg',
+                'wind_avg', 'sunhours_sum', 'radn_sum']
+
+
+def stat_columns(period, specs=ASOS_SPECS):
+    """월별/주차별 출력 컬럼 순서"""
+    names = [spec['name'] for spec in specs]
+    ordered = [c for c in OUTPUT_ORDER if c in names or c in MEAN_COLUMNS or c in SUM_COLUMNS]
+    return ['year', 'doy', period] + ordered + [name for name in names if name not in ordered]
+
+
+def aggregate_period(df, period, keys, specs=ASOS_SPECS):
+    """keys로 묶은 그룹마다 월별/주차별 통계 계산
+
+    평균/합계는 groupby 한 번, 임계값 통계는 변수별 구간화 한 번(threshold_stats)으로 계산한다.
+    keys에 'stn_id'를 넣으면 여러 지점을 이어 붙인 일자료도 한 번에 집계한다.
+    반환 프레임은 keys를 인덱스로, stat_columns(period, specs)를 컬럼으로 가진다.
+    """
+    first_columns = ['year', 'doy', period]
+    values = pd.DataFrame({c: df[c] for c in first_columns}, index=df.index)
+    for name, column in {**MEAN_COLUMNS, **SUM_COLUMNS}.items():
+        values[name] = df[column]
+
+    grouped = values.groupby([df[k].rename(f'_{k}') for k in keys], sort=True)
+    result = pd.concat([
+        grouped[first_columns].first(),
+        grouped[list(MEAN_COLUMNS)].mean(),
+        grouped[list(SUM_COLUMNS)].sum(),
+    ], axis=1)
+    result.index.names = keys
+
+    thresholds = aggregate_specs(df, keys, specs)
+    result = result.join(thresholds)
+    return result[stat_columns(period, specs)]
+
+
+def iter_daily(stations, start, end, input_path):
+    """일자료를 YEARS_PER_CHUNK년씩 연도 순서대로 읽어 내보냄 (지점코드는 stn_id 컬럼)
+
+    저장소에 아직 없는 지점은 캐시 CSV에서 한 번 옮겨 넣고 결측을 보간한다.
+    """
+    store = DailyStore(os.path.join(input_path, STORE_DIR))
+    stored = set(store.station_ids())
+    missing = stations[~stations['지점코드'].isin(stored)]
+    if not missing.empty:
+        import_cache(store, missing, input_path)
+        fill_store(store, missing['지점코드'].tolist())
+
+    for chunk_start in range(start, end + 1, YEARS_PER_CHUNK):
+        chunk_end = min(end, chunk_start + YEARS_PER_CHUNK - 1)
+        daily = store.load(stations['지점코드'].tolist(), (chunk_start, chunk_end), AGGREGATE_COLUMNS)
+        if not daily.empty:
+            yield chunk_end, daily
+
+
+def output_file_path(output_path, station_code, station_name, suffix):
+    return os.path.join(output_path, f'{station_code}', f"{station_code}_{station_name}_{suffix}.csv")
+
+
+def partition_hashes(df, keys):
+    """파티션(지점, 연도, 월 또는 ISO 주)별 일자료 해시 - 행 해시의 합이라 행 순서와 무관"""
+    row_hash = pd.util.hash_pandas_object(df[AGGREGATE_COLUMNS], index=False)
+    hashes = row_hash.groupby([df[k] for k in keys]).sum()
+    return hashes.map('{:016x}'.format)
+
+
+def read_manifest(path, keys):
+    if not os.path.exists(path):
+        return pd.Series(dtype=object, index=pd.MultiIndex.from_tuples([], names=keys))
+    return pd.read_csv(path, dtype={'hash': str}).set_index(keys)['hash']
+
+
+def write_manifest(path, hashes):
+    hashes.sort_index().rename('hash').reset_index().to_csv(path + '.tmp', index=False)
+    os.replace(path + '.tmp', path)
+
+
+def output_partitions(df, period):
+    """출력 행의 파티션 키 - 월별은 (연도, 월), 주차별은 첫 날짜의 (ISO 연도, 주)"""
+    if period == 'month':
+        return pd.MultiIndex.from_arrays([df['year'].astype(int), df['month'].astype(int)])
+
+    first_day = pd.to_datetime(df['year'].astype(int).astype(str) + df['doy'].astype(int).astype(str).str.zfill(3),
+                               format='%Y%j')
+    iso = first_day.dt.isocalendar()
+    return pd.MultiIndex.from_arrays([iso['year'].astype(int), iso['week'].astype(int)])
+
+
+def update_outputs(stations, batches, period, keys, output_path, suffix, specs, previous, incremental):
+    """일자료 배치를 차례로 집계해 지점별 출력 파일로 저장하고 (파티션 해시, 다시 계산한 파티션 수) 반환
+
+    배치마다 끝난 (지점, 연도, 월/주) 파티션만 들어 있어야 한다 (한 파티션이 두 배치에 나뉘면 안 됨).
+    incremental이면 지난 실행의 파티션 해시(previous)와 비교해
+    일자료가 바뀌거나 새로 생긴 파티션만 다시 계산하고 기존 출력 파일에 병합한다.
+    이번에 읽지 않은(기간 밖) 파티션은 기존 출력에서 뺀다.
+    """
+    partition_keys = keys[:3]
+    paths = {station['지점코드']: output_file_path(output_path, station['지점코드'], station['지점명'], suffix)
+             for index, station in stations.iterrows()}
+
+    missing_outputs = []
+    if incremental:
+        # 출력 파일이 없거나 컬럼 구성(specs)이 달라진 지점은 전체를 다시 계산
+        columns = stat_columns(period, specs)
+        missing_outputs = [code for code, path in paths.items()
+                           if not os.path.exists(path) or list(pd.read_csv(path, nrows=0).columns[1:]) != columns]
+
+    hash_parts, changed_parts, result_parts = [], [], []
+    for daily in batches:
+        hashes = partition_hashes(daily, partition_keys)
+        changed = hashes.index
+        if incremental:
+            is_changed = (hashes != previous.reindex(hashes.index)).to_numpy()
+            changed = hashes.index[is_changed | hashes.index.get_level_values('stn_id').isin(missing_outputs)]
+
+        subset = daily[pd.MultiIndex.from_frame(daily[partition_keys]).isin(changed)]
+        if not subset.empty:
+            result_parts.append(aggregate_period(subset, period, keys, specs))
+        hash_parts.append(hashes)
+        changed_parts.append(changed.to_frame(index=False))
+
+    hashes = pd.concat(hash_parts) if hash_parts else \
+        pd.Series(dtype=object, index=pd.MultiIndex.from_tuples([], names=partition_keys))
+    changed = pd.MultiIndex.from_frame(pd.concat(changed_parts, ignore_index=True)) if changed_parts else hashes.index
+    result = pd.concat(result_parts) if result_parts else pd.DataFrame(columns=stat_columns(period, specs))
+    # 배치는 시간 순서라 지점별로 모으면 (연도, 월/주) 순서가 유지된다
+    by_station = dict(list(result.groupby(level='stn_id', sort=False))) if not result.empty else {}
+
+    changed_stations = set(changed.get_level_values('stn_id'))
+    if incremental:
+        # 기간(start/end)이 좁아져 이번에 읽지 않은 파티션은 출력에서 뺀다
+        removed = previous.index.difference(hashes.index)
+        changed_stations |= set(removed.get_level_values('stn_id')) & set(paths)
+    for station_code, path in paths.items():
+        if incremental and station_code not in changed_stations:
+            continue
+
+        df_station = by_station.get(station_code, pd.DataFrame(columns=result.columns)).reset_index(drop=True)
+        if incremental and os.path.exists(path):
+            # 다시 계산한 파티션만 교체하고 (연도, 월/주) 순서로 정렬
+            old = pd.read_csv(path, index_col=0, float_precision='round_trip')
+            station_changed = changed[changed.get_level_values('stn_id') == station_code].droplevel('stn_id')
+            station_read = hashes.index[hashes.index.get_level_values('stn_id') == station_code].droplevel('stn_id')
+            old_partitions = output_partitions(old, period)
+            old = old[old_partitions.isin(station_read) & ~old_partitions.isin(station_changed)]
+            frames = [df for df in (old, df_station) if not df.empty]
+            df_station = pd.concat(frames, ignore_index=True) if frames else df_station
+            order = output_partitions(df_station, period).to_frame(index=False)
+            df_station = df_station.iloc[order.sort_values(list(order.columns), kind='stable').index]
+            df_station = df_station.reset_index(drop=True)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        df_station.to_csv(path)
+
+    return hashes, len(changed)
+
+
+def iter_monthly_input(stations, start, end, input_path):
+    """월은 연도를 넘지 않으므로 읽은 연도 묶음을 그대로 배치로"""
+    for chunk_end, daily in iter_daily(stations, start, end, input_path):
+        yield daily
+
+
+def iter_weekly_input(stations, start, end, input_path):
+    """ISO 주 단위 배치 - 연도 묶음을 차례로 읽으면서 끝난 주만 내보내고,
+    연말에 걸친 마지막 주는 다음 묶음과 합쳐서 내보낸다.
+    """
+    keys = ['stn_id', 'iso_year', 'week'] + LOCATION_COLUMNS
+    carry = None
+
+    # ISO 주는 연말/연초에 걸치므로 다음 해 초까지 읽고 ISO 연도로 자른다
+    for chunk_end, daily in iter_daily(stations, start, end + 1, input_path):
+        dates = pd.to_datetime(pd.DataFrame({'year': daily['year'], 'month': daily['month'], 'day': daily['day']}),
+                               errors='coerce')
+        iso = dates.dt.isocalendar()
+        daily['iso_year'] = iso['year'].astype(int)
+        daily['week'] = iso['week'].astype(int)
+        daily = daily[daily['iso_year'].between(start, end)]
+
+        if carry is not None:
+            daily = pd.concat([carry, daily], ignore_index=True)
+
+        # 묶음 마지막 날(12/31)이 속한 주는 다음 해로 이어질 수 있어 남겨 둔다
+        last_year, last_week, _ = pd.Timestamp(chunk_end, 12, 31).isocalendar()
+        open_week = (daily['iso_year'] == last_year) & (daily['week'] == last_week)
+        carry = daily[open_week]
+        finished = daily[~open_week]
+
+        log_short_weeks(finished, keys)
+        if not finished.empty:
+            yield finished
+
+    if carry is not None and not carry.empty:
+        log_short_weeks(carry, keys)
+        yield carry
+
+
+def log_short_weeks(daily, keys):
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    days = daily.groupby(keys).size()
+    for (station_code, iso_year, week_num), count in days[days != 7].droplevel(keys[3:]).items():
+        logger.debug(f"{station_code}: {iso_year}년 {week_num}주는 {count}일치만 있습니다.")
+
+
+# 기간 종류 → (입력 로더, 그룹 키, 출력 파일 접미사)
+PERIODS = {
+    'month': (iter_monthly_input, ['stn_id', 'year', 'month'] + LOCATION_COLUMNS, 'monthly'),
+    'week': (iter_weekly_input, ['stn_id', 'iso_year', 'week'] + LOCATION_COLUMNS, 'weekly'),
+}
+
+
+def process_stations(stations, period, start, end, input_path, output_path, specs, previous, incremental):
+    """지점들의 일자료를 읽어 집계/저장 - 작업 프로세스 하나가 맡는 단위"""
+    iter_input, keys, suffix = PERIODS[period]
+    batches = iter_input(stations, start, end, input_path)
+    return update_outputs(stations, batches, period, keys, output_path, suffix, specs, previous, incremental)
+
+
+def cal_period_data(stations, period, start, end, input_path, output_path, specs, incremental, workers):
+    """월별/주차별 통계 계산
+
+    workers가 1이면 전 지점을 한 번에 집계하고, 2 이상이면 지점마다 작업 프로세스 하나가
+    읽기/집계/저장을 맡는다. 진행 상황과 파티션 해시(manifest_<suffix>.csv)는 이 프로세스에서 모은다.
+    """
+    iter_input, keys, suffix = PERIODS[period]
+    manifest_path = os.path.join(output_path, f'manifest_{suffix}.csv')
+    previous = read_manifest(manifest_path, keys[:3])
+    previous_stn = previous.index.get_level_values('stn_id')
+
+    results = []
+    if workers <= 1:
+        results.append(process_stations(stations, period, start, end, input_path, output_path, specs,
+                                        previous, incremental))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(process_stations, stations.iloc[[i]], period, start, end, input_path, output_path,
+                                specs, previous[previous_stn == code], incremental)
+                for i, code in enumerate(stations['지점코드'])
+            ]
+            for future in tqdm.tqdm(as_completed(futures), total=len(futures), desc=f"processing {suffix}",
+                                    disable=not logger.isEnabledFor(logging.INFO)):
+                results.append(future.result())
+
+    hashes = pd.concat([h for h, _ in results if not h.empty] or [results[0][0]])
+    n_changed = sum(n for _, n in results)
+
+    # 이번에 다루지 않은 지점의 해시는 그대로 둔다
+    previous = previous[~previous_stn.isin(stations['지점코드'])]
+    os.makedirs(output_path, exist_ok=True)
+    write_manifest(manifest_path, pd.concat([previous, hashes]) if not previous.empty else hashes)
+    logger.info(f"[{suffix}] 다시 계산한 파티션 {n_changed}개 / 전체 {len(hashes)}개")
+
+
+def cal_monthly_data(stations, start, end, input_path, output_path, specs=ASOS_SPECS, incremental=False, workers=1):
+    cal_period_data(stations, 'month', start, end, input_path, output_path, specs, incremental, workers)
+
+
+def cal_weekly_data(stations, start, end, input_path, output_path, specs=ASOS_SPECS, incremental=False, workers=1):
+    cal_period_data(stations, 'week', start, end, input_path, output_path, specs, incremental, workers)
 
-def data_statics(period, group_df):
-    #################################################################################
-    # 강우일수, 강우량 합계, 강우량 10mm 이상, 30mm 이상, 50mm 이상, 70mm 이상, 90mm 이상, 110mm 이상
-    # 평균기온, 평균최고기온, 평균최저기온, 편균 기온 10-30도 사이의 합
-    # 평균습도
-    # 평균풍속
-    #################################################################################
-
-
-    rainy_day = group_df[group_df['rain'] > 0]['rain'].count()
-    total_rain = group_df['rain'].sum()
-    
-
-    weekly_data = {
-        'year': group_df['year'].values[0],
-        'doy': group_df['doy'].values[0],
-        rf'{period}': group_df[period].values[0],
-        'rainy_day': rainy_day, # 강수일수
-        'total_rain': total_rain, # 강우량합계
-        'tavg': group_df['tavg'].mean(), # 평균기온
-        'tmin_avg': group_df['mint'].mean(), # 평균최저기온
-        'tmax_avg': group_df['maxt'].mean(), # 평균최고기온,
-        'tavg_10_30_between_sum': group_df[(group_df['tavg'] >= 10) & (group_df['tavg'] <= 30)]['tavg'].sum(), # 10도 이상 30도 이하의 일 수
-        'humid_avg': group_df['humid'].mean(), # 평균습도
-        'wind_avg': group_df['wind'].mean(), # 평균풍속
-        'sunhours_sum': group_df['sunhours'].sum(), # 일조시간합계
-        'radn_sum': group_df['radn'].sum(), # 일사량합계
-    }
-    for x in range(1, 12, 2):
-        weekly_data[f'rain_more_{x * 10}'] = group_df[group_df['rain'] > x * 10]['rain'].count() # 강우량 x mm 이상
-
-    for x in range(5, 11, 5):
-        weekly_data[f'tavg_less_{x}_count'] = group_df[group_df['tavg'] <= x ]['tavg'].count() # 온도 x 이하의 일 수
-        weekly_data[f'tavg_less_{x}_sum'] = group_df[group_df['tavg'] <= x ]['tavg'].sum() # 온도 x 이하의 일 수
-        
-    for x in range(15, 41, 5):
-        weekly_data[f'tavg_more_{x}_count'] = group_df[group_df['tavg'] >= x ]['tavg'].count() # 온도 x 이하의 일 수
-        weekly_data[f'tavg_more_{x}_sum'] = group_df[group_df['tavg'] >= x ]['tavg'].sum() # 온도 x 이하의 일 수
-
-
-
-    
-    return weekly_data
-
-def cal_monthly_data(stations, start, end, input_path, output_path):
-    for index, station in stations.iterrows():
-        station_code = station['지점코드']
-        station_name = station['지점명']
-
-        df_monthly = pd.DataFrame()
-        for y in tqdm.tqdm(range(start, end + 1), desc=f"processing {station_name} ({station_code})"):
-            cache_dir = os.path.join(input_path, "cache_weather", str(station_code), str(y))
-            cache_filename = os.path.join(cache_dir, f"{station_code}_{station_name}_{y}.csv")
-
-            try:
-                df = pd.read_csv(cache_filename, encoding='utf-8-sig')
-                grouped_df = df.groupby(['year', 'month', 'latitude', 'longitude', 'altitude'])
-                for idx, group in grouped_df:
-                    rainy_day = group[group['rain'] > 0]['rain'].count()
-                    total_rain = group['rain'].sum()
-
-                    monthly_data = data_statics('month', group)
-
-                    df_monthly = pd.concat([df_monthly, pd.DataFrame([monthly_data])], ignore_index=True)
-            except FileNotFoundError:
-                print(f"File not found: {cache_filename}")
-                continue
-
-        output_folder_path = os.path.join(output_path, f'{station_code}')
-        os.makedirs(output_folder_path, exist_ok=True)
-
-        output_file_path = os.path.join(output_folder_path, f"{station_code}_{station_name}_monthly.csv")
-        df_monthly.to_csv(output_file_path)
-
-def cal_weekly_data(stations, start, end, input_path, output_path):
-    for index, station in stations.iterrows():
-        station_code = station['지점코드']
-        station_name = station['지점명']
-
-        df_weekly = pd.DataFrame()
-        df_all = pd.DataFrame()
-        for y in tqdm.tqdm(range(start, end + 2), desc=f"processing {station_name} ({station_code})"):
-            # print(y)
-            cache_dir = os.path.join(input_path, "cache_weather", str(station_code), str(y))
-            cache_filename = os.path.join(cache_dir, f"{station_code}_{station_name}_{y}.csv")
-
-            try:
-                df = pd.read_csv(cache_filename, encoding='utf-8-sig')
-                df_all = pd.concat([df_all, df], ignore_index=True)
-            except:
-                print(f"File not found: {cache_filename}")
-                continue
-
-        df_all['date'] = df_all['year'].astype(str) + '-' + df_all['month'].astype(str).str.zfill(2) + '-' + df_all[
-            'day'].astype(
-            str).str.zfill(2)
-
-        df_all['date'] = pd.to_datetime(df_all['date'], errors='coerce')
-        df_all['iso_year'] = df_all['date'].dt.isocalendar().year
-        df_all['week'] = df_all['date'].dt.isocalendar().week
-        df_all = df_all[df_all['iso_year'].between(start, end)]
-        df_all.to_csv('df_all.csv', index=False)
-        grouped_df = df_all.groupby(['iso_year', 'week', 'latitude', 'longitude', 'altitude'])
-
-
-        for idx, group in grouped_df:
-            week_num = idx[1]
-
-            print(f"=================={idx[0]}===================")
-            print(group)
-            print(idx[0], week_num, group['week'].count())
-
-            if group['week'].count() != 7 and idx[0] != '2025':
-                print(f"Skipping week {week_num} of year {idx[0]} due to insufficient data.")
-
-            weekly_data = data_statics('week', group)
-
-            df_weekly = pd.concat([df_weekly, pd.DataFrame([weekly_data])], ignore_index=True)
-
-        output_folder_path = os.path.join(output_path, f'{station_code}')
-        os.makedirs(output_folder_path, exist_ok=True)
-
-        output_file_path = os.path.join(output_folder_path, f"{station_code}_{station_name}_weekly.csv")
-        df_weekly.to_csv(output_file_path)
 
 def main():
+    parser = argparse.ArgumentParser(description='ASOS 월별/주차별 통계 계산')
+    parser.add_argument('--incremental', action='store_true',
+                        help='일자료가 바뀐 (지점, 연도, 월/주)만 다시 계산해 기존 출력에 병합')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='지점을 나눠 처리할 프로세스 수 (1이면 전 지점을 한 프로세스에서 한 번에 집계)')
+    parser.add_argument('--log-level', default='WARNING', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help='로그 수준 (DEBUG면 7일이 안 되는 주도 출력)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level, format='%(asctime)s - %(levelname)s - %(message)s')
+
     input_dir = 'download_weather'
     output_path = './output'
 
@@ -138,8 +328,8 @@ def main():
     file_path = './input/지점코드.csv'
     stations = pd.read_csv(file_path)
 
-    cal_monthly_data(stations, start, end, input_dir, output_path)
-    cal_weekly_data(stations, start, end, input_dir, output_path)
+    cal_monthly_data(stations, start, end, input_dir, output_path, incremental=args.incremental, workers=args.workers)
+    cal_weekly_data(stations, start, end, input_dir, output_path, incremental=args.incremental, workers=args.workers)
 
 
 if __name__ == '__main__':
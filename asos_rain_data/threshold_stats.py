@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+# 임계값/구간 통계를 설정(spec)으로 정의하고, 변수마다 np.digitize 한 번 + np.bincount로 모든 통계를 계산한다.
+#
+# spec 하나는 출력 컬럼 하나다.
+#   name : 출력 컬럼명
+#   var  : 일자료 컬럼 (rain, tavg, ...)
+#   stat : 'count'  - 조건을 만족하는 일수
+#          'sum'    - 조건을 만족하는 값의 합
+#          'excess' - 조건을 만족하는 값의 (값 - base) 합 (적산온도 등)
+#   gt / ge / lt / le : 조건 (초과 / 이상 / 미만 / 이하), 생략하면 그쪽은 열린 구간
+#   base : excess의 기준값 (생략하면 하한 gt/ge 값)
+#
+# 같은 변수의 spec들은 경계값을 모아 하나의 구간 목록으로 컴파일되므로
+# 새 지표를 추가해도 일자료 전체를 다시 훑는 횟수는 늘지 않는다.
+
+STATS = ('count', 'sum', 'excess')
+
+# 농업 지표 예시 - cal_monthly_data/cal_weekly_data의 specs에 더해 쓴다
+AGRO_SPECS = [
+    {'name': 'gdd_10', 'var': 'tavg', 'stat': 'excess', 'gt': 10},  # 생육도일 (기준 10℃)
+    {'name': 'gdd_5', 'var': 'tavg', 'stat': 'excess', 'gt': 5},  # 생육도일 (기준 5℃)
+    {'name': 'chill_days', 'var': 'tavg', 'ge': 0, 'le': 7.2},  # 저온 일수 (0~7.2℃)
+    {'name': 'heavy_rain_80', 'var': 'rain', 'ge': 80},  # 호우 일수 (80mm 이상)
+]
+
+
+def _lower_edge(spec):
+    """하한 조건을 'x >= edge' 형태로 (없으면 -inf)"""
+    if 'gt' in spec:
+        return np.nextafter(float(spec['gt']), np.inf)
+    if 'ge' in spec:
+        return float(spec['ge'])
+    return -np.inf
+
+
+def _upper_edge(spec):
+    """상한 조건을 'x < edge' 형태로 (없으면 inf)"""
+    if 'le' in spec:
+        return np.nextafter(float(spec['le']), np.inf)
+    if 'lt' in spec:
+        return float(spec['lt'])
+    return np.inf
+
+
+def compile_specs(specs):
+    """spec 목록을 변수별 (경계값 배열, [(컬럼명, 시작 구간, 끝 구간, 통계, 기준값)])으로 컴파일
+
+    모든 조건을 반열린 구간 [하한, 상한)으로 바꿔 두면 np.digitize(right=False) 한 번으로
+    각 값이 속한 구간 번호가 나오고, 조건은 연속한 구간 번호 범위가 된다.
+    """
+    by_var = {}
+    for spec in specs:
+        stat = spec.get('stat', 'count')
+        if stat not in STATS:
+            raise ValueError(f"알 수 없는 통계: {stat} ({spec['name']})")
+        if stat == 'excess' and 'base' not in spec and 'gt' not in spec and 'ge' not in spec:
+            raise ValueError(f"excess는 base 또는 하한(gt/ge)이 필요합니다: {spec['name']}")
+        by_var.setdefault(spec['var'], []).append(spec)
+
+    compiled = {}
+    for var, var_specs in by_var.items():
+        bounds = [(_lower_edge(s), _upper_edge(s)) for s in var_specs]
+        edges = np.unique([e for bound in bounds for e in bound if np.isfinite(e)])
+
+        outputs = []
+        for spec, (lo, hi) in zip(var_specs, bounds):
+            # digitize 결과 i는 edges[i-1] <= x < edges[i]
+            start = 0 if lo == -np.inf else int(np.searchsorted(edges, lo)) + 1
+            stop = len(edges) + 1 if hi == np.inf else int(np.searchsorted(edges, hi)) + 1
+            stat = spec.get('stat', 'count')
+            base = spec.get('base', spec.get('gt', spec.get('ge')))
+            outputs.append((spec['name'], start, stop, stat, base))
+        compiled[var] = (edges, outputs)
+    return compiled
+
+
+def apply_specs(compiled, df, codes, n_groups):
+    """그룹 번호(codes, 0..n_groups-1, 제외할 행은 -1)별로 컴파일된 spec 통계 계산
+
+    변수마다 구간 번호를 한 번 구하고, (그룹, 구간)별 일수/합계를 bincount 한 번씩으로 모은 뒤
+    각 spec은 구간 범위만 더한다. 결측값은 어느 조건에도 포함되지 않는다.
+    """
+    codes = np.asarray(codes)
+    columns = {}
+    for var, (edges, outputs) in compiled.items():
+        x = df[var].to_numpy(dtype=float)
+        valid = ~np.isnan(x) & (codes >= 0)
+        x = x[valid]
+
+        n_bins = len(edges) + 1
+        flat = codes[valid] * n_bins + np.digitize(x, edges)
+        counts = np.bincount(flat, minlength=n_groups * n_bins).reshape(n_groups, n_bins)
+        sums = np.bincount(flat, weights=x, minlength=n_groups * n_bins).reshape(n_groups, n_bins)
+
+        for name, start, stop, stat, base in outputs:
+            count = counts[:, start:stop].sum(axis=1)
+            if stat == 'count':
+                columns[name] = count
+            elif stat == 'sum':
+                columns[name] = sums[:, start:stop].sum(axis=1)
+            else:
+                columns[name] = sums[:, start:stop].sum(axis=1) - base * count
+
+    names = [output[0] for _, outputs in compiled.values() for output in outputs]
+    return pd.DataFrame(columns, columns=names)
+
+
+def aggregate_specs(df, keys, specs):
+    """keys로 묶은 그룹별 spec 통계 (인덱스는 keys, 정렬된 그룹 순서)"""
+    grouped = df.groupby(keys, sort=True)
+    result = apply_specs(compile_specs(specs), df, grouped.ngroup().to_numpy(), grouped.ngroups)
+    result.index = grouped.size().index
+    return result[[spec['name'] for spec in specs]]
@@ -0,0 +1,215 @@
+import os
+import sqlite3
+from contextlib import closing
+
+import pandas as pd
+
+# 저장소 스키마 버전 (PRAGMA user_version) - 올라가면 파일당 한 번 마이그레이션한다
+SCHEMA_VERSION = 1
+
+# 저장 컬럼 (기존 CSV와 같은 순서)
+COLUMNS = ['baseDate', 'baseTime', 'category', 'fcstDate', 'fcstTime', 'fcstValue', 'nx', 'ny',
+           'longitude', 'latitude']
+# 같은 발표의 같은 예보는 한 번만 저장 (baseDate, baseTime이 키 앞에 있어 발표 단위 조회가 인덱스를 탄다)
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS forecast (
+    baseDate TEXT NOT NULL,
+    baseTime TEXT NOT NULL,
+    category TEXT NOT NULL,
+    fcstDate TEXT NOT NULL,
+    fcstTime TEXT NOT NULL,
+    fcstValue TEXT,
+    nx INTEGER NOT NULL,
+    ny INTEGER NOT NULL,
+    longitude REAL,
+    latitude REAL,
+    PRIMARY KEY (baseDate, baseTime, nx, ny, category, fcstDate, fcstTime)
+) WITHOUT ROWID
+"""
+
+# 전체 카테고리 저장용 넓은 형식 - (격자, 예보 시각)당 한 행, 카테고리별 타입 고정
+# 단기(getVilageFcst)와 초단기(getUltraSrtFcst) 카테고리를 모두 포함
+CATEGORY_DTYPES = {
+    'SKY': 'Int8',      # 하늘상태 (코드)
+    'PTY': 'Int8',      # 강수형태 (코드)
+    'POP': 'Int8',      # 강수확률 (%)
+    'REH': 'Int8',      # 습도 (%)
+    'LGT': 'Int8',      # 낙뢰 (코드)
+    'TMP': 'float32',   # 1시간 기온 (℃)
+    'T1H': 'float32',   # 기온 (℃, 초단기)
+    'TMN': 'float32',   # 일 최저기온 (℃)
+    'TMX': 'float32',   # 일 최고기온 (℃)
+    'PCP': 'float32',   # 1시간 강수량 (mm)
+    'RN1': 'float32',   # 1시간 강수량 (mm, 초단기)
+    'SNO': 'float32',   # 1시간 신적설 (cm)
+    'UUU': 'float32',   # 풍속 동서성분 (m/s)
+    'VVV': 'float32',   # 풍속 남북성분 (m/s)
+    'VEC': 'float32',   # 풍향 (deg)
+    'WSD': 'float32',   # 풍속 (m/s)
+    'WAV': 'float32',   # 파고 (M)
+}
+WIDE_KEY_COLUMNS = ['baseDate', 'baseTime', 'fcstDate', 'fcstTime', 'nx', 'ny']
+WIDE_COLUMNS = WIDE_KEY_COLUMNS + ['longitude', 'latitude'] + list(CATEGORY_DTYPES)
+
+CREATE_WIDE_TABLE_SQL = f"""
+CREATE TABLE IF NOT EXISTS forecast_wide (
+    baseDate TEXT NOT NULL,
+    baseTime TEXT NOT NULL,
+    fcstDate TEXT NOT NULL,
+    fcstTime TEXT NOT NULL,
+    nx INTEGER NOT NULL,
+    ny INTEGER NOT NULL,
+    longitude REAL,
+    latitude REAL,
+    {', '.join(f"{c} {'INTEGER' if t == 'Int8' else 'REAL'}" for c, t in CATEGORY_DTYPES.items())},
+    PRIMARY KEY (baseDate, baseTime, nx, ny, fcstDate, fcstTime)
+) WITHOUT ROWID
+"""
+
+
+class ForecastStore:
+    """월별 예보 SQLite 저장소
+
+    새로 수집한 행만 INSERT OR IGNORE로 추가하고, 중복 제거는 기본 키가 담당한다.
+    파일 전체를 다시 읽거나 다시 쓰지 않는다.
+    SKY만 저장하는 긴 형식(forecast)과 전체 카테고리를 담는 넓은 형식(forecast_wide)을 함께 둔다.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(CREATE_TABLE_SQL)
+            conn.execute(CREATE_WIDE_TABLE_SQL)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path)
+
+    @property
+    def schema_version(self):
+        with closing(self._connect()) as conn:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def set_schema_version(self, version):
+        with closing(self._connect()) as conn, conn:
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+
+    def backfill_locations(self, grid_df):
+        """위치 정보가 빈 행을 (nx, ny) 키로 한 번에 채우고, 채운 행 수 반환"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("CREATE TEMP TABLE grid (nx INTEGER, ny INTEGER, longitude REAL, latitude REAL, "
+                         "PRIMARY KEY (nx, ny))")
+            conn.executemany(
+                "INSERT OR REPLACE INTO grid VALUES (?, ?, ?, ?)",
+                grid_df[['nx', 'ny', 'longitude', 'latitude']].astype(object).itertuples(index=False, name=None),
+            )
+            before = conn.total_changes
+            conn.execute(
+                "UPDATE forecast SET "
+                "longitude = COALESCE(longitude, (SELECT g.longitude FROM grid g "
+                "WHERE g.nx = forecast.nx AND g.ny = forecast.ny)), "
+                "latitude = COALESCE(latitude, (SELECT g.latitude FROM grid g "
+                "WHERE g.nx = forecast.nx AND g.ny = forecast.ny)) "
+                "WHERE longitude IS NULL OR latitude IS NULL"
+            )
+            return conn.total_changes - before
+
+    @staticmethod
+    def _normalize(df):
+        """API 응답/CSV 어느 쪽에서 와도 같은 키 형식이 되도록 정리"""
+        df = df.reindex(columns=COLUMNS).copy()
+        df['baseDate'] = df['baseDate'].astype(str)
+        df['fcstDate'] = df['fcstDate'].astype(str)
+        df['baseTime'] = df['baseTime'].astype(str).str.zfill(4)
+        df['fcstTime'] = df['fcstTime'].astype(str).str.zfill(4)
+        df['fcstValue'] = df['fcstValue'].astype(str)
+        df['nx'] = df['nx'].astype(int)
+        df['ny'] = df['ny'].astype(int)
+        df['longitude'] = df['longitude'].astype(float)
+        df['latitude'] = df['latitude'].astype(float)
+        return df
+
+    def _insert(self, table, columns, df):
+        rows = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+        placeholders = ', '.join('?' * len(columns))
+
+        with closing(self._connect()) as conn, conn:
+            before = conn.total_changes
+            conn.executemany(
+                f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+                rows,
+            )
+            return conn.total_changes - before
+
+    def append(self, df):
+        """새 행 추가, 실제로 추가된 행 수 반환 (이미 있는 키는 무시)"""
+        if df.empty:
+            return 0
+        return self._insert('forecast', COLUMNS, self._normalize(df))
+
+    def append_wide(self, df):
+        """넓은 형식(전체 카테고리) 행 추가, 실제로 추가된 행 수 반환"""
+        if df.empty:
+            return 0
+        return self._insert('forecast_wide', WIDE_COLUMNS, df.reindex(columns=WIDE_COLUMNS))
+
+    def completeness_counts(self, base_date, base_time, category='SKY'):
+        """해당 발표 시각의 (nx, ny)별 저장 건수 (긴 형식과 넓은 형식 합계)"""
+        self._check_category(category)
+        with closing(self._connect()) as conn:
+            counts = pd.read_sql_query(
+                "SELECT nx, ny, COUNT(*) AS cnt FROM forecast "
+                "WHERE baseDate = ? AND baseTime = ? AND category = ? GROUP BY nx, ny "
+                f"UNION ALL SELECT nx, ny, COUNT({category}) AS cnt FROM forecast_wide "
+                "WHERE baseDate = ? AND baseTime = ? GROUP BY nx, ny",
+                conn,
+                params=(base_date, base_time, category, base_date, base_time),
+            )
+        return counts.groupby(['nx', 'ny'])['cnt'].sum()
+
+    def read_releases(self, since=None, category='SKY'):
+        """발표 시각이 since(baseDate, baseTime) 이후인 행 조회 (since 포함, None이면 전체)
+
+        넓은 형식에 저장된 값도 같은 긴 형식 컬럼으로 함께 돌려준다.
+        """
+        self._check_category(category)
+        since_sql, since_params = self._since_clause(since)
+        wide_value = f"CAST({category} AS TEXT)" if CATEGORY_DTYPES[category] == 'Int8' else category
+        query = (
+            f"SELECT {', '.join(COLUMNS)} FROM forecast WHERE category = ?{since_sql} "
+            f"UNION ALL SELECT baseDate, baseTime, ? AS category, fcstDate, fcstTime, {wide_value} AS fcstValue, "
+            f"nx, ny, longitude, latitude FROM forecast_wide WHERE {category} IS NOT NULL{since_sql}"
+        )
+        params = [category] + since_params + [category] + since_params
+
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(query, conn, params=params)
+
+    def read_wide(self, since=None):
+        """넓은 형식 조회 - 카테고리 컬럼을 CATEGORY_DTYPES 타입으로 변환해 반환"""
+        since_sql, since_params = self._since_clause(since)
+        with closing(self._connect()) as conn:
+            df = pd.read_sql_query(
+                f"SELECT {', '.join(WIDE_COLUMNS)} FROM forecast_wide WHERE 1 = 1{since_sql}",
+                conn,
+                params=since_params,
+            )
+        return df.astype(CATEGORY_DTYPES)
+
+    @staticmethod
+    def _since_clause(since):
+        if since is None:
+            return '', []
+        base_date, base_time = since
+        return " AND (baseDate > ? OR (baseDate = ? AND baseTime >= ?))", [base_date, base_date, base_time]
+
+    @staticmethod
+    def _check_category(category):
+        if category not in CATEGORY_DTYPES:
+            raise ValueError(f"알 수 없는 카테고리: {category}")
+
+    def count(self):
+        """테이블별 저장 건수 {'forecast': 긴 형식 행 수, 'forecast_wide': 넓은 형식 행 수}"""
+        with closing(self._connect()) as conn:
+            return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                    for table in ('forecast', 'forecast_wide')}
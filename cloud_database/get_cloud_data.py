@@ -1,13 +1,23 @@
 import os
 import sys
+import argparse
+import glob
+import time
+import threading
+import random
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
 from tqdm import tqdm
 from io import StringIO
 from zoneinfo import ZoneInfo
 import requests
+from requests.adapters import HTTPAdapter
 import logging
 
+from forecast_store import ForecastStore, SCHEMA_VERSION, CATEGORY_DTYPES, WIDE_KEY_COLUMNS
+
 # 설정 상수들
 BASE_TIMES = ['0200', '0500', '0800', '1100', '1400', '1700', '2000', '2300']
 BASE_HOURS = [2, 5, 8, 11, 14, 17, 20, 23]
@@ -16,21 +26,107 @@ SEOUL_TZ = ZoneInfo("Asia/Seoul")
 
 SERVICE_KEY = os.getenv("API_KEY")
 
+# 완성으로 간주할 격자당 SKY 예보 건수 (초단기: 6시간, 단기: 3일 72시간)
+EXPECTED_SKY_RECORDS = {'ultra_short': 6, 'short_term': 72}
+
+# 단기예보 응답 구성 (페이지 크기 계산용)
+HOURLY_CATEGORY_COUNT = 12  # 예보 시각마다 오는 카테고리 (TMP, UUU, VVV, VEC, WSD, SKY, PTY, POP, WAV, PCP, REH, SNO)
+DAILY_CATEGORY_COUNT = 2  # 하루 한 번 오는 카테고리 (TMN, TMX)
+SHORT_TERM_HORIZON_DAYS = 3  # 단기예보 예보 기간 (글피까지)
+
+# 상주 모드 스케줄 (발표 HH:10 직후, 기존 GitHub Actions cron '11 * * * *'과 같은 분)
+SCHEDULE_MINUTE = 11
+SCHEDULE_MISFIRE_GRACE = 20 * 60  # 이 시간(초) 이상 늦어진 회차는 건너뜀
+
+# 동시 요청 설정 (환경 변수로 조정 가능)
+MAX_WORKERS = int(os.getenv("MAX_WORKERS", "16"))  # 동시에 보낼 최대 요청 수
+MAX_REQUESTS_PER_SEC = float(os.getenv("MAX_REQUESTS_PER_SEC", "30"))  # 전역 초당 요청 상한 (0이면 제한 없음)
+
+# 요청 재시도 (지터를 준 지수 백오프) 및 수집 중 중간 저장 주기
+MAX_RETRIES = int(os.getenv("MAX_RETRIES", "4"))
+RETRY_BACKOFF_BASE = 1.0  # 초
+RETRY_BACKOFF_MAX = 30.0  # 초
+NORMAL_CODE = '00'  # header.resultCode - 정상
+NO_DATA_CODE = '03'  # 해당 발표 시각 자료 없음
+FLUSH_EVERY = int(os.getenv("FLUSH_EVERY", "50"))  # 이 격자 수만큼 모이면 저장소에 추가
+
+# 1이면 SKY만이 아니라 전체 카테고리를 넓은 형식으로 저장
+ALL_CATEGORIES = os.getenv("ALL_CATEGORIES", "0") == "1"
+
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
+class ApiResultError(Exception):
+    """header.resultCode가 정상(00)/자료 없음(03)이 아닌 응답 (인증키 오류, 잘못된 파라미터 등 - 재시도하지 않음)"""
+
+
+class RateLimiter:
+    """여러 스레드가 공유하는 전역 요청 속도 제한기"""
+
+    def __init__(self, max_per_sec):
+        self.interval = 1.0 / max_per_sec if max_per_sec > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_time = time.monotonic()
+
+    def wait(self):
+        """다음 요청 슬롯까지 대기"""
+        if not self.interval:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            wait_time = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.interval
+
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+
 class WeatherDataCollector:
-    def __init__(self, region_csv_path='지역_코드_정리.csv'):
+    def __init__(self, region_csv_path='지역_코드_정리.csv', max_workers=MAX_WORKERS,
+                 max_requests_per_sec=MAX_REQUESTS_PER_SEC, all_categories=ALL_CATEGORIES):
+        self.all_categories = all_categories
         self.region_df = pd.read_csv(region_csv_path, encoding='utf-8-sig')
+        self.grid_df = self._build_grid_index(self.region_df)
+        self.max_workers = max(1, max_workers)
+        self.rate_limiter = RateLimiter(max_requests_per_sec)
+        self.session = self._create_session()
+        self._stores = {}  # 열어 둔 월별 저장소 (데몬 모드에서 실행 간 재사용)
+        self._update_clock()
+
+    def _update_clock(self):
+        """현재 시각과 저장 경로 갱신 (데몬 모드에서는 실행마다 호출)"""
         self.now = datetime.now(SEOUL_TZ)
         self.now_year = str(self.now.year)
         self.now_month = str(self.now.month)
         self.data_dir = os.path.join('data', self.now_year)
         os.makedirs(self.data_dir, exist_ok=True)
 
+    @staticmethod
+    def _build_grid_index(region_df):
+        """지역 목록을 예보 격자(nx, ny) 단위로 묶은 인덱스 생성
+
+        같은 격자의 지역들은 API 응답이 동일하므로 격자당 한 번만 요청한다.
+        위치 정보는 기존 데이터 보정과 같은 규칙(마지막 지역 값)을 따른다.
+        """
+        grid_df = region_df.groupby(['격자 X', '격자 Y'], sort=False).agg(
+            longitude=('경도(초/100)', 'last'),
+            latitude=('위도(초/100)', 'last'),
+            region_count=('행정구역코드', 'size'),
+        ).reset_index()
+        return grid_df.rename(columns={'격자 X': 'nx', '격자 Y': 'ny'})
+
+    def _create_session(self):
+        """호스트별 커넥션을 재사용하는 HTTP 세션 생성"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
     def _calculate_base_time_for_short_term(self):
         """단기예보용 base_time 계산 (02,05,08,11,14,17,20,23시)"""
         current_hour = self.now.hour
@@ -66,12 +162,53 @@ class WeatherDataCollector:
         base_time = f"{base_hour:02d}00"
         return base_date, base_time
 
-    def _make_api_request(self, nx, ny, base_date, base_time, num_rows=1000):
-        """API 요청을 보내고 응답을 처리"""
+    def _expected_rows(self, data_type, base_date, base_time):
+        """발표 시각별로 필요한 응답 행 수 (페이지 크기로 사용)
+
+        응답은 예보 시각 순으로 시각마다 HOURLY_CATEGORY_COUNT개 카테고리가 오고,
+        TMN(06시)/TMX(15시)가 하루 한 번씩 끼어 있다.
+        """
+        if data_type == 'ultra_short':
+            # 앞쪽 6시간만 필요 (TMN/TMX가 끼어 있을 수 있으므로 여유분 포함)
+            return EXPECTED_SKY_RECORDS['ultra_short'] * HOURLY_CATEGORY_COUNT + DAILY_CATEGORY_COUNT
+
+        # 단기예보: 발표 다음 시각부터 SHORT_TERM_HORIZON_DAYS일 뒤 23시까지
+        base = datetime.strptime(base_date + base_time, '%Y%m%d%H%M')
+        end = (base + timedelta(days=SHORT_TERM_HORIZON_DAYS)).replace(hour=23)
+        hours = int((end - base).total_seconds() // 3600)
+        days = (end.date() - base.date()).days + 1
+        return hours * HOURLY_CATEGORY_COUNT + days * DAILY_CATEGORY_COUNT
+
+    def _request_page(self, nx, ny, base_date, base_time, num_rows, page_no):
+        """한 페이지 요청 - 실패하면 지터를 준 지수 백오프로 MAX_RETRIES번까지 재시도"""
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                return self._send_page_request(nx, ny, base_date, base_time, num_rows, page_no)
+            except (requests.exceptions.RequestException, ApiResultError, KeyError, ValueError, TypeError) as e:
+                if attempt == MAX_RETRIES or not self._is_retryable(e):
+                    raise
+                delay = random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** attempt))
+                logger.warning(f"재시도 {attempt + 1}/{MAX_RETRIES} (nx={nx}, ny={ny}, {delay:.1f}초 후): {e}")
+                time.sleep(delay)
+
+    @staticmethod
+    def _is_retryable(error):
+        """일시적 오류인지 판단 - 전송 오류와 HTTP 5xx/429만 재시도
+
+        resultCode 오류(ApiResultError)나 응답 구조가 다른 경우는 재시도해도 같은 결과다.
+        """
+        if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+            status = error.response.status_code
+            return status == 429 or status >= 500
+        # 연결/타임아웃 오류, 과부하 시 JSON 대신 오는 오류 응답 (requests의 JSONDecodeError도 RequestException)
+        return isinstance(error, requests.exceptions.RequestException)
+
+    def _send_page_request(self, nx, ny, base_date, base_time, num_rows, page_no):
+        """한 페이지 요청 - (items, totalCount) 반환"""
         params = {
             'serviceKey': SERVICE_KEY,
             'numOfRows': str(num_rows),
-            'pageNo': '1',
+            'pageNo': str(page_no),
             'dataType': 'JSON',
             'base_date': base_date,
             'base_time': base_time,
@@ -79,27 +216,75 @@ class WeatherDataCollector:
             'ny': ny
         }
 
+        self.rate_limiter.wait()
+        response = self.session.get(URL, params=params, timeout=30)
+        if response.status_code != 200:
+            raise requests.exceptions.HTTPError(f"API 요청 실패: {response.status_code}", response=response)
+
+        js = response.json()['response']
+        result_code = js['header']['resultCode']
+        if result_code == NO_DATA_CODE:
+            return [], 0
+        if result_code != NORMAL_CODE:
+            raise ApiResultError(f"API 오류 응답: {result_code} {js['header'].get('resultMsg', '')}")
+
+        body = js['body']
+        items = body['items']['item']
+        return items, int(body.get('totalCount', len(items)))
+
+    def _make_api_request(self, nx, ny, base_date, base_time, num_rows, max_rows=None):
+        """API 요청을 보내고 응답을 처리
+
+        totalCount가 한 페이지보다 크면 다음 페이지를 이어서 받는다. max_rows가 있으면 그만큼만 받는다.
+        """
         try:
-            response = requests.get(URL, params=params, timeout=30)
-            if response.status_code == 200:
-                data = response.json()
-                items = data['response']['body']['items']['item']
-                return pd.DataFrame(items)
-            else:
-                logger.error(f"API 요청 실패: {response.status_code} for nx={nx}, ny={ny}")
-                return pd.DataFrame()
+            items, total_count = self._request_page(nx, ny, base_date, base_time, num_rows, 1)
+            wanted = total_count if max_rows is None else min(total_count, max_rows)
+
+            # 페이지 단위로 바로 DataFrame을 만들어 응답 전체를 한꺼번에 들고 있지 않는다
+            frames = [pd.DataFrame(items)]
+            received = len(items)
+            page_no = 1
+            while received < wanted:
+                page_no += 1
+                items, _ = self._request_page(nx, ny, base_date, base_time, num_rows, page_no)
+                if not items:
+                    break
+                frames.append(pd.DataFrame(items))
+                received += len(items)
+
+            if received < wanted:
+                logger.warning(f"응답 행 수 부족 (nx={nx}, ny={ny}): {received}/{wanted}")
+
+            return pd.concat(frames, ignore_index=True)
         except requests.exceptions.RequestException as e:
             logger.error(f"요청 실패 (nx={nx}, ny={ny}): {e}")
             return pd.DataFrame()
-        except (KeyError, ValueError) as e:
+        except ApiResultError as e:
+            logger.error(f"{e} (nx={nx}, ny={ny})")
+            return pd.DataFrame()
+        except (KeyError, ValueError, TypeError) as e:
             logger.error(f"응답 파싱 실패 (nx={nx}, ny={ny}): {e}")
             return pd.DataFrame()
 
+    def _validate_sky_count(self, df, nx, ny, data_type):
+        """전처리 결과의 SKY 예보 수를 완성도 기준(EXPECTED_SKY_RECORDS)과 비교"""
+        if self.all_categories:
+            sky_count = int(df['SKY'].notna().sum()) if 'SKY' in df.columns else 0
+        else:
+            sky_count = len(df)
+
+        if sky_count < EXPECTED_SKY_RECORDS[data_type]:
+            logger.warning(f"SKY 예보 수 부족 (nx={nx}, ny={ny}): {sky_count}/{EXPECTED_SKY_RECORDS[data_type]}")
+
     def _process_weather_data(self, df):
         """기상 데이터 전처리"""
         if df.empty:
             return df
 
+        if self.all_categories:
+            return self._pivot_categories(df)
+
         # SKY 카테고리만 필터링
         df = df[df['category'] == 'SKY'].copy()
 
@@ -109,35 +294,107 @@ class WeatherDataCollector:
 
         return df.reset_index(drop=True)
 
+    @staticmethod
+    def _parse_forecast_values(values):
+        """fcstValue를 숫자로 변환
+
+        강수량/적설 문자열은 '강수없음'/'적설없음' → 0, 'x 미만' → x/2, 'a~b' 및 'x 이상' → 하한값으로 바꾼다.
+        결측 코드(±900 이상)는 NaN으로 둔다.
+        """
+        text = values.astype(str)
+        numeric = pd.to_numeric(text, errors='coerce')
+        bound = pd.to_numeric(text.str.extract(r'(\d+(?:\.\d+)?)')[0], errors='coerce')
+        bound = bound.where(~text.str.contains('미만'), bound / 2)
+
+        parsed = numeric.fillna(bound).mask(text.str.contains('없음'), 0.0)
+        return parsed.mask(parsed.abs() >= 900)
+
+    def _pivot_categories(self, df):
+        """전체 카테고리를 (격자, 예보 시각)당 한 행의 넓은 형식으로 변환"""
+        df = df[df['category'].isin(CATEGORY_DTYPES.keys())].copy()
+        df['baseDate'] = df['baseDate'].astype(str)
+        df['fcstDate'] = df['fcstDate'].astype(str)
+        df['baseTime'] = df['baseTime'].astype(str).str.zfill(4)
+        df['fcstTime'] = df['fcstTime'].astype(str).str.zfill(4)
+        df['value'] = self._parse_forecast_values(df['fcstValue'])
+
+        wide = df.groupby(WIDE_KEY_COLUMNS + ['category'], sort=False)['value'].first().unstack('category')
+        wide = wide.reindex(columns=list(CATEGORY_DTYPES))
+
+        # 정수형 카테고리는 반올림 후 변환 (Int8은 결측 허용)
+        int_columns = [c for c, t in CATEGORY_DTYPES.items() if t == 'Int8']
+        wide[int_columns] = wide[int_columns].round()
+        wide = wide.astype(CATEGORY_DTYPES)
+        wide.columns.name = None
+
+        return wide.reset_index()
+
+    def _fetch_grid_cells(self, targets, base_date, base_time, data_type, store, desc):
+        """여러 격자를 동시에 요청하고, 끝난 격자를 FLUSH_EVERY개마다 저장소에 중간 저장
+
+        targets: (nx, ny, longitude, latitude) 튜플 목록
+        중간 저장된 격자는 완성도 확인에서 스킵되므로, 중단 후 다시 실행하면 남은 격자만 요청한다.
+        반환값: 수집된 격자 수
+        """
+        if not targets:
+            return 0
+
+        num_rows = self._expected_rows(data_type, base_date, base_time)
+        # 초단기는 앞쪽 6시간만 쓰므로 첫 페이지만 받는다
+        max_rows = num_rows if data_type == 'ultra_short' else None
+
+        def fetch(target):
+            nx, ny, longitude, latitude = target
+            raw_data = self._make_api_request(nx, ny, base_date, base_time, num_rows, max_rows)
+            df = self._process_weather_data(raw_data)
+            if not df.empty:
+                self._validate_sky_count(df, nx, ny, data_type)
+                # 격자 결과를 해당 격자의 위치 정보와 함께 저장
+                df['longitude'] = longitude
+                df['latitude'] = latitude
+            return df
+
+        collected_count = 0
+        pending = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(fetch, target) for target in targets]
+            try:
+                for future in tqdm(as_completed(futures), total=len(futures), desc=desc):
+                    df = future.result()
+                    if df.empty:
+                        continue
+
+                    pending.append(df)
+                    collected_count += 1
+                    if len(pending) >= FLUSH_EVERY:
+                        self._save_data(store, pending)
+                        pending = []
+            finally:
+                # 중간에 예외가 나도 이미 받은 격자는 저장
+                if pending:
+                    self._save_data(store, pending)
+
+        return collected_count
+
     def _get_existing_data(self, file_path):
         """기존 데이터 로드"""
         if os.path.exists(file_path):
             return pd.read_csv(file_path, encoding='utf-8-sig')
         return pd.DataFrame()
 
-    def _check_data_completeness(self, existing_df, nx, ny, longitude, latitude, base_date, base_time, data_type):
-        """특정 지역의 데이터 완성도 확인"""
-        if existing_df.empty:
-            return False
-
-        # 기본 필터링 조건 (nx, ny, baseTime, baseDate로만 확인)
-        # longitude, latitude는 나중에 추가될 수 있으므로 필터링에서 제외
-        region_data = existing_df[
-            (existing_df['nx'] == nx) &
-            (existing_df['ny'] == ny) &
-            (existing_df['baseTime'] == base_time) &
-            (existing_df['baseDate'] == int(base_date))
-            ]
-
-        # 데이터 완성도 확인
-        if data_type == 'ultra_short':
-            # 초단기예보는 6시간(6개 시간대) 예보
-            expected_records = 6
-        else:
-            # 단기예보는 3일간 예보 (72시간)
-            expected_records = 72
+    def _find_complete_cells(self, completeness_counts, data_type):
+        """격자별 데이터 완성도 확인 (grid_df 순서의 bool 배열 반환)
+
+        completeness_counts: 해당 발표 시각의 (nx, ny)별 저장 건수
+        longitude, latitude는 나중에 추가될 수 있으므로 키에서 제외한다.
+        """
+        if completeness_counts.empty:
+            return np.zeros(len(self.grid_df), dtype=bool)
+
+        lookup = pd.MultiIndex.from_frame(self.grid_df[['nx', 'ny']])
+        counts = completeness_counts.reindex(lookup, fill_value=0).to_numpy()
 
-        return len(region_data) >= expected_records
+        return counts >= EXPECTED_SKY_RECORDS[data_type]
 
     def _should_collect_data(self, data_type):
         """데이터 수집 여부 판단"""
@@ -151,6 +408,8 @@ class WeatherDataCollector:
 
     def collect_weather_data(self, data_type='ultra_short'):
         """기상 데이터 수집 메인 함수"""
+        self._update_clock()
+
         # 수집 시점 확인
         if not self._should_collect_data(data_type):
             logger.info(f"⏰ {data_type} 데이터 수집 시간이 아닙니다.")
@@ -164,93 +423,166 @@ class WeatherDataCollector:
 
         logger.info(f"🐻 {data_type} 기상 데이터 수집 시작 - {base_date} {base_time} 기준")
 
-        file_suffix = '_ultra' if data_type == 'ultra_short' else '_short_term'
-        file_path = os.path.join(self.data_dir, f"{self.now_year}_{self.now_month}{file_suffix}.csv")
-
-        existing_df = self._get_existing_data(file_path)
-        new_data_list = []
-        skipped_count = 0
-
-        for _, row in tqdm(self.region_df.iterrows(),
-                           total=len(self.region_df),
-                           desc=f"🌤️ {data_type} 기상 데이터 처리 중"):
+        store = self._open_store(data_type)
 
-            nx, ny = row['격자 X'], row['격자 Y']
-            longitude, latitude = row['경도(초/100)'], row['위도(초/100)']
+        # 기존 데이터가 완전한 격자는 스킵 (저장소 인덱스 조회 한 번으로 전체 판단)
+        completeness_counts = store.completeness_counts(base_date, base_time)
+        complete = self._find_complete_cells(completeness_counts, data_type)
+        pending_df = self.grid_df[~complete]
 
-            # 기존 데이터가 완전한지 확인
-            if self._check_data_completeness(existing_df, nx, ny, longitude, latitude, base_date, base_time, data_type):
-                skipped_count += 1
-                continue
+        skipped_count = int(complete.sum())
+        target_region_count = int(pending_df['region_count'].sum())
+        targets = list(pending_df[['nx', 'ny', 'longitude', 'latitude']].itertuples(index=False, name=None))
 
-            # 새 데이터 수집
-            raw_data = self._make_api_request(nx, ny, base_date, base_time)
-            processed_data = self._process_weather_data(raw_data)
+        logger.info(f"🗺️ 지역 {len(self.region_df)}개 → 격자 {len(self.grid_df)}개 "
+                    f"(요청 대상 격자 {len(targets)}개, 지역 {target_region_count}개)")
 
-            if not processed_data.empty:
-                new_data_list.append(processed_data)
+        # 새 데이터 동시 수집 (격자당 1회 요청, 수집 중간중간 저장소에 추가)
+        collected_count = self._fetch_grid_cells(targets, base_date, base_time, data_type, store,
+                                                 desc=f"🌤️ {data_type} 기상 데이터 처리 중")
 
-        logger.info(f"📊 스킵된 지역: {skipped_count}, 새로 수집된 지역: {len(new_data_list)}")
+        logger.info(f"📊 스킵된 격자: {skipped_count}, 새로 수집된 격자: {collected_count}")
 
-        # 데이터 병합 및 저장
-        if new_data_list:
-            self._save_data(existing_df, new_data_list, file_path)
+        if collected_count:
+            counts = store.count()
+            logger.info(f"💾 저장소 전체 {counts['forecast']} 레코드 (SKY), "
+                        f"{counts['forecast_wide']} 레코드 (전체 카테고리)")
         else:
             logger.info("💡 수집할 새 데이터가 없습니다.")
 
         logger.info(f"🐻✅ {data_type} 기상 데이터 수집 완료 - {base_date} {base_time} 기준")
 
-    def _add_location_to_existing_data(self, df, column_type):
-        """기존 데이터에 위치 정보 추가"""
+    def _add_location_to_existing_data(self, df):
+        """기존 데이터에 위치 정보 추가 - (nx, ny) 키 병합 한 번으로 경도/위도를 함께 채움"""
         if df.empty:
             return df
 
-        # 복사본 생성
-        df_copy = df.copy()
+        locations = self.grid_df[['nx', 'ny', 'longitude', 'latitude']].rename(
+            columns={'longitude': 'longitude_grid', 'latitude': 'latitude_grid'})
+        merged = df.merge(locations, on=['nx', 'ny'], how='left')
 
-        # 지역 정보와 매칭해서 위치 정보 추가
-        for _, region_row in self.region_df.iterrows():
-            nx, ny = region_row['격자 X'], region_row['격자 Y']
+        # 이미 값이 있는 행은 그대로 두고 빈 칸만 채움
+        for column_type in ['longitude', 'latitude']:
+            grid_values = merged.pop(f'{column_type}_grid')
+            if column_type in merged.columns:
+                merged[column_type] = merged[column_type].fillna(grid_values)
+            else:
+                merged[column_type] = grid_values
 
-            if column_type == 'longitude':
-                location_value = region_row['경도(초/100)']
-            else:  # latitude
-                location_value = region_row['위도(초/100)']
+        return merged
 
-            # 해당 nx, ny에 해당하는 행들에 위치 정보 추가
-            mask = (df_copy['nx'] == nx) & (df_copy['ny'] == ny)
-            df_copy.loc[mask, column_type] = location_value
+    def _open_store(self, data_type):
+        """이번 달 저장소 열기 - 스키마 버전이 낮으면 파일당 한 번만 마이그레이션"""
+        file_suffix = '_ultra' if data_type == 'ultra_short' else '_short_term'
+        return self._open_store_file(os.path.join(self.data_dir, f"{self.now_year}_{self.now_month}{file_suffix}"))
 
-        return df_copy
+    def _open_store_file(self, file_stem):
+        """<file_stem>.sqlite 저장소 열기 (같은 이름의 기존 CSV가 있으면 처음 한 번 가져온다)"""
+        db_path = f"{file_stem}.sqlite"
 
-    def _save_data(self, existing_df, new_data_list, file_path):
-        """데이터 저장 - 누락된 컬럼 자동 추가"""
-        logger.info("💾 데이터 저장 중...")
+        if db_path in self._stores:
+            return self._stores[db_path]
 
-        new_df = pd.concat(new_data_list, ignore_index=True)
+        store = ForecastStore(db_path)
+        if store.schema_version < SCHEMA_VERSION:
+            self._migrate_store(store, f"{file_stem}.csv")
 
-        if not existing_df.empty:
-            # 기존 데이터에 longitude, latitude 컬럼이 없으면 추가
-            if 'longitude' not in existing_df.columns:
-                logger.info("📍 기존 데이터에 longitude 컬럼 추가 중...")
-                existing_df = self._add_location_to_existing_data(existing_df, 'longitude')
+        self._stores[db_path] = store
+        return store
 
-            if 'latitude' not in existing_df.columns:
-                logger.info("📍 기존 데이터에 latitude 컬럼 추가 중...")
-                existing_df = self._add_location_to_existing_data(existing_df, 'latitude')
+    def _migrate_store(self, store, legacy_csv_path):
+        """저장소 마이그레이션 - 기존 CSV 가져오기 및 누락된 위치 정보 보정"""
+        if os.path.exists(legacy_csv_path):
+            logger.info(f"📦 기존 CSV 가져오는 중: {legacy_csv_path}")
+            existing_df = self._get_existing_data(legacy_csv_path)
 
-            final_df = pd.concat([existing_df, new_df], ignore_index=True)
-            final_df.drop_duplicates(inplace=True)
+            logger.info("📍 기존 데이터에 longitude, latitude 컬럼 추가 중...")
+            existing_df = self._add_location_to_existing_data(existing_df)
+
+            inserted = store.append(existing_df)
+            logger.info(f"📦 가져오기 완료: {inserted} 레코드")
+
+        updated = store.backfill_locations(self.grid_df)
+        if updated:
+            logger.info(f"📍 위치 정보 보정: {updated} 레코드")
+
+        store.set_schema_version(SCHEMA_VERSION)
+
+    def migrate_legacy_csvs(self, data_root='data'):
+        """data/<연도>/<연도>_<월>_{ultra,short_term}.csv를 모두 같은 이름의 저장소로 옮기고, 옮긴 파일 수 반환
+
+        이미 마이그레이션한 저장소(스키마 버전이 최신)는 건너뛰므로 매번 실행해도 된다.
+        """
+        migrated = 0
+        for file_suffix in ['_ultra', '_short_term']:
+            for csv_path in sorted(glob.glob(os.path.join(data_root, '*', f'*_*{file_suffix}.csv'))):
+                file_stem = csv_path[:-len('.csv')]
+                db_path = f"{file_stem}.sqlite"
+                if os.path.exists(db_path) and ForecastStore(db_path).schema_version >= SCHEMA_VERSION:
+                    continue
+                self._open_store_file(file_stem)
+                migrated += 1
+
+        if migrated:
+            logger.info(f"📦 기존 월별 CSV {migrated}개를 저장소로 옮겼습니다.")
+        return migrated
+
+    def _save_data(self, store, new_data_list):
+        """새로 수집한 데이터만 저장소에 추가"""
+        new_df = pd.concat(new_data_list, ignore_index=True)
+        if self.all_categories:
+            inserted = store.append_wide(new_df)
         else:
-            final_df = new_df
+            inserted = store.append(new_df)
+
+        logger.info(f"💾 저장 완료: 격자 {len(new_data_list)}개, {inserted} 레코드 추가")
+
+def run_daemon(collector):
+    """상주 모드 - 발표 시각마다 수집하고, 이전 수집이 끝나지 않았으면 그 회차는 건너뜀"""
+    # APScheduler는 데몬 모드에서만 필요하므로 여기서 불러온다
+    from apscheduler.schedulers.blocking import BlockingScheduler
+    from apscheduler.executors.pool import ThreadPoolExecutor as SchedulerExecutor
+
+    # 작업을 한 스레드에서 차례로 실행해 수집기 상태(세션, 저장소)를 공유한다
+    scheduler = BlockingScheduler(executors={'default': SchedulerExecutor(1)}, timezone=SEOUL_TZ)
+    job_defaults = dict(max_instances=1, coalesce=True, misfire_grace_time=SCHEDULE_MISFIRE_GRACE)
+
+    # 초단기예보: 매시간 HH:10 발표
+    scheduler.add_job(collector.collect_weather_data, 'cron', args=['ultra_short'],
+                      minute=SCHEDULE_MINUTE, id='ultra_short', **job_defaults)
+    # 단기예보: BASE_HOURS 발표
+    scheduler.add_job(collector.collect_weather_data, 'cron', args=['short_term'],
+                      hour=','.join(str(h) for h in BASE_HOURS), minute=SCHEDULE_MINUTE,
+                      id='short_term', **job_defaults)
+
+    logger.info(f"⏱️ 상주 모드 시작 - 매시 {SCHEDULE_MINUTE}분 초단기, "
+                f"{BASE_HOURS}시 {SCHEDULE_MINUTE}분 단기 수집")
+    try:
+        scheduler.start()
+    except (KeyboardInterrupt, SystemExit):
+        logger.info("⏹️ 상주 모드 종료")
 
-        final_df.to_csv(file_path, index=False, encoding='utf-8-sig')
-        logger.info(f"💾 저장 완료: {len(final_df)} 레코드")
 
 def main():
     """메인 실행 함수"""
+    parser = argparse.ArgumentParser(description='기상청 단기/초단기 예보 SKY 데이터 수집')
+    parser.add_argument('--daemon', action='store_true', help='스케줄러로 상주하며 발표 시각마다 수집')
+    parser.add_argument('--all-categories', action='store_true', default=ALL_CATEGORIES,
+                        help='SKY뿐 아니라 전체 카테고리를 넓은 형식으로 저장')
+    parser.add_argument('--migrate', action='store_true', help='기존 월별 CSV만 저장소로 옮기고 종료')
+    args = parser.parse_args()
+
     try:
-        collector = WeatherDataCollector()
+        collector = WeatherDataCollector(all_categories=args.all_categories)
+
+        # 이전 달들의 CSV도 저장소/API에서 보이도록 (이미 옮긴 파일은 건너뜀)
+        collector.migrate_legacy_csvs()
+        if args.migrate:
+            return
+
+        if args.daemon:
+            run_daemon(collector)
+            return
 
         # ultra_short와 short_term 둘 다 수집
         for data_type in ['ultra_short', 'short_term']:
@@ -1,8 +1,206 @@
 import os
+import glob
+import time
+import threading
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional
+
 import pandas as pd
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from forecast_store import ForecastStore
+
+DATA_DIR = os.getenv("DATA_DIR", "data")
+REGION_CSV_PATH = os.getenv("REGION_CSV_PATH", "지역_코드_정리.csv")
+REFRESH_INTERVAL = float(os.getenv("REFRESH_INTERVAL", "60"))  # 새 파일 확인 주기 (초)
+EXPORT_CHUNK_ROWS = 50000
+
+# API 경로 → 저장소 파일 접미사
+DATA_TYPES = {'ultra_short_data': '_ultra', 'short_term_data': '_short_term'}
+INDEX_COLUMNS = ['nx', 'ny', 'baseDate', 'baseTime', 'fcstDate', 'fcstTime', 'sky', 'longitude', 'latitude']
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class ForecastIndex:
+    """수집된 SKY 예보를 메모리에 올려 둔 인덱스
+
+    시작할 때 저장소 파일을 모두 읽고, 이후에는 새로 생기거나 변경된 파일에서
+    마지막으로 읽은 발표 시각 이후의 행만 추가로 읽는다.
+    """
+
+    def __init__(self, data_dir, file_suffix):
+        self.pattern = os.path.join(data_dir, '*', f'*{file_suffix}.sqlite')
+        self._files = {}  # path → (mtime, 마지막으로 읽은 (baseDate, baseTime))
+        self._frame = self._empty_frame()
+        self._lock = threading.Lock()
+        self._last_refresh = None
+
+    @staticmethod
+    def _empty_frame():
+        frame = pd.DataFrame(columns=INDEX_COLUMNS + ['base', 'fcst', 'source'])
+        return frame.set_index(['nx', 'ny'])
+
+    def refresh(self, force=False):
+        """새 파일/변경된 파일만 증분 반영 (REFRESH_INTERVAL 안에는 다시 확인하지 않음)"""
+        now = time.monotonic()
+        if not force and self._last_refresh is not None and now - self._last_refresh < REFRESH_INTERVAL:
+            return
+
+        with self._lock:
+            self._last_refresh = now
+            updates = []
+            for path in sorted(glob.glob(self.pattern)):
+                mtime = os.path.getmtime(path)
+                known = self._files.get(path)
+                if known is not None and known[0] == mtime:
+                    continue
+
+                since = known[1] if known is not None else None
+                rows = ForecastStore(path).read_releases(since=since)
+                watermark = since
+                if not rows.empty:
+                    last = rows.sort_values(['baseDate', 'baseTime']).iloc[-1]
+                    watermark = (last['baseDate'], last['baseTime'])
+                self._files[path] = (mtime, watermark)
+                updates.append((path, since, rows))
+
+            if updates:
+                self._apply_updates(updates)
+
+    def _apply_updates(self, updates):
+        frame = self._frame.reset_index()
+        new_frames = []
+        for path, since, rows in updates:
+            if since is not None:
+                # 마지막으로 읽은 발표 시각은 중간 저장으로 행이 늘었을 수 있으므로 다시 읽은 것으로 교체
+                stale = (frame['source'] == path) & (frame['base'] >= ''.join(since))
+                frame = frame[~stale]
+            if not rows.empty:
+                new_frames.append(self._to_index_rows(rows, path))
+
+        if new_frames:
+            frame = pd.concat(([frame] if not frame.empty else []) + new_frames, ignore_index=True)
+        self._frame = frame.sort_values(['nx', 'ny', 'base', 'fcst']).set_index(['nx', 'ny'])
+        logger.info(f"🔄 인덱스 갱신: 파일 {len(updates)}개, 전체 {len(self._frame)} 레코드")
+
+    @staticmethod
+    def _to_index_rows(rows, path):
+        rows = rows.rename(columns={'fcstValue': 'sky'})
+        rows['sky'] = pd.to_numeric(rows['sky'], errors='coerce').astype('Int8')
+        rows = rows[INDEX_COLUMNS].copy()
+        rows['base'] = rows['baseDate'] + rows['baseTime']
+        rows['fcst'] = rows['fcstDate'] + rows['fcstTime']
+        rows['source'] = path
+        return rows
+
+    def cell(self, nx, ny):
+        """격자 하나의 전체 예보 (발표 시각, 예보 시각 순)"""
+        self.refresh()
+        frame = self._frame
+        if (nx, ny) not in frame.index:
+            return frame.iloc[0:0]
+        return frame.loc[[(nx, ny)]]
+
+    def export(self, start=None, end=None):
+        """발표 시각 범위로 자른 전체 인덱스"""
+        self.refresh()
+        frame = self._frame
+        if start:
+            frame = frame[frame['base'] >= start]
+        if end:
+            frame = frame[frame['base'] <= end]
+        return frame.reset_index()
+
+
+indexes = {data_type: ForecastIndex(DATA_DIR, suffix) for data_type, suffix in DATA_TYPES.items()}
+region_df = pd.read_csv(REGION_CSV_PATH, encoding='utf-8-sig') if os.path.exists(REGION_CSV_PATH) else pd.DataFrame()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    for index in indexes.values():
+        index.refresh(force=True)
+    yield
+
+
+app = FastAPI(title="cloud_database", lifespan=lifespan)
+
+
+def _get_index(data_type):
+    if data_type not in indexes:
+        raise HTTPException(status_code=404, detail=f"지원하지 않는 데이터 종류: {data_type}")
+    return indexes[data_type]
+
+
+def _resolve_cell(region_code, nx, ny):
+    """행정구역코드 또는 격자 좌표로 (nx, ny) 결정"""
+    if region_code is not None:
+        matched = region_df[region_df['행정구역코드'] == region_code] if not region_df.empty else region_df
+        if matched.empty:
+            raise HTTPException(status_code=404, detail=f"지역을 찾을 수 없습니다: {region_code}")
+        return int(matched.iloc[0]['격자 X']), int(matched.iloc[0]['격자 Y'])
+
+    if nx is None or ny is None:
+        raise HTTPException(status_code=400, detail="region_code 또는 nx, ny가 필요합니다.")
+    return nx, ny
+
+
+def _forecast_records(rows):
+    return [
+        {'baseDate': r.baseDate, 'baseTime': r.baseTime, 'fcstDate': r.fcstDate, 'fcstTime': r.fcstTime,
+         'sky': None if pd.isna(r.sky) else int(r.sky)}
+        for r in rows.itertuples(index=False)
+    ]
+
+
+@app.get("/{data_type}/latest")
+def latest_forecast(data_type: str, region_code: Optional[int] = None,
+                    nx: Optional[int] = None, ny: Optional[int] = None):
+    """지역/격자의 가장 최근 발표 SKY 예보"""
+    index = _get_index(data_type)
+    nx, ny = _resolve_cell(region_code, nx, ny)
+
+    rows = index.cell(nx, ny)
+    if rows.empty:
+        raise HTTPException(status_code=404, detail=f"데이터가 없습니다: nx={nx}, ny={ny}")
+
+    rows = rows[rows['base'] == rows['base'].iloc[-1]]
+    return {'nx': nx, 'ny': ny, 'forecasts': _forecast_records(rows)}
+
+
+@app.get("/{data_type}/range")
+def forecast_range(data_type: str, start: str = Query(..., description="예보 시작 시각 YYYYMMDDHHMM"),
+                   end: str = Query(..., description="예보 종료 시각 YYYYMMDDHHMM"),
+                   region_code: Optional[int] = None, nx: Optional[int] = None, ny: Optional[int] = None,
+                   all_releases: bool = False):
+    """예보 시각 범위 조회 - 기본은 예보 시각마다 가장 최근 발표만 반환"""
+    index = _get_index(data_type)
+    nx, ny = _resolve_cell(region_code, nx, ny)
+
+    rows = index.cell(nx, ny)
+    rows = rows[(rows['fcst'] >= start) & (rows['fcst'] <= end)]
+    if not all_releases:
+        rows = rows.sort_values(['fcst', 'base']).drop_duplicates('fcst', keep='last')
+    return {'nx': nx, 'ny': ny, 'forecasts': _forecast_records(rows)}
+
+
+@app.get("/{data_type}/export")
+def export_forecasts(data_type: str, start: Optional[str] = Query(None, description="발표 시작 시각 YYYYMMDDHHMM"),
+                     end: Optional[str] = Query(None, description="발표 종료 시각 YYYYMMDDHHMM")):
+    """인덱스 전체(또는 발표 시각 범위)를 CSV로 내보내기"""
+    index = _get_index(data_type)
+    frame = index.export(start, end)[INDEX_COLUMNS]
+
+    def iter_csv():
+        for offset in range(0, len(frame), EXPORT_CHUNK_ROWS):
+            chunk = frame.iloc[offset:offset + EXPORT_CHUNK_ROWS]
+            yield chunk.to_csv(index=False, header=offset == 0)
+        if frame.empty:
+            yield frame.to_csv(index=False)
 
-df = pd.read_excel('지역_코드.xlsx')
-df = df[df['3단계'].isnull()]
-df = df[df['2단계'].notnull()]
-df = df[['구분', '행정구역코드', '1단계', '2단계', '격자 X', '격자 Y', '경도(초/100)', '위도(초/100)']]
-df.to_csv('지역_코드_정리.csv', index=False, encoding='utf-8-sig')
\ No newline at end of file
+    return StreamingResponse(iter_csv(), media_type='text/csv',
+                             headers={'Content-Disposition': f'attachment; filename="{data_type}.csv"'})